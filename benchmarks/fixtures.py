@@ -0,0 +1,189 @@
+"""
+Offline fixtures for the pipeline benchmarks: a synthetic market with known
+market-model parameters, ESG news for N tickers, and stand-ins for GNews,
+yfinance and FinBERT that serve it without touching the network or a model.
+
+Every ticker's daily return is alpha + beta * market + noise; on each
+article's event day the return also gets +ABNORMAL_RETURN (positive headline)
+or -ABNORMAL_RETURN (negative headline), so the event study has a known
+answer to recover.
+"""
+import numpy as np
+import pandas as pd
+
+from src.esg_matcher import ESG_KEYWORDS
+from src.metrics import timed
+
+SP500_TICKER = "^GSPC"
+VIX_TICKER = "^VIX"
+# Events fall on business days in this range; prices cover a margin around it
+EVENT_START = "2024-01-02"
+EVENT_END = "2025-12-31"
+PRICE_MARGIN_DAYS = 200
+MARKET_DRIFT, MARKET_VOL = 0.0004, 0.01
+IDIOSYNCRATIC_VOL = 0.012
+ALPHA_RANGE = (-0.0005, 0.0005)
+BETA_RANGE = (0.6, 1.6)
+ABNORMAL_RETURN = 0.02
+
+POSITIVE_WORDS = ["beats", "upgrade", "record", "surges", "wins", "expands"]
+NEGATIVE_WORDS = ["misses", "downgrade", "lawsuit", "plunges", "fined", "recall"]
+SENTIMENT_WORDS = {"positive": POSITIVE_WORDS, "negative": NEGATIVE_WORDS}
+LABEL_SIGN = {"positive": 1, "negative": -1, "neutral": 0}
+
+
+def _vocabulary(rng, size=2000):
+    # Random pronounceable filler words keep headlines far apart for the dedup pass
+    consonants, vowels = list("bcdfghklmnprstvz"), list("aeiou")
+    words = set()
+    while len(words) < size:
+        n = rng.integers(2, 4)
+        words.add("".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(n)))
+    return sorted(words)
+
+
+class SyntheticMarket:
+    """
+    Deterministic prices and news for n_tickers with n_events articles in
+    total. alpha, beta and the label of every article are kept so results
+    can be checked against them.
+    """
+
+    def __init__(self, n_tickers, n_events, seed=0, duplicate_fraction=0.05):
+        rng = np.random.default_rng(seed)
+        self.tickers = [f"T{i:04d}" for i in range(n_tickers)]
+        self.dates = pd.bdate_range(pd.Timestamp(EVENT_START) - pd.Timedelta(days=PRICE_MARGIN_DAYS),
+                                    pd.Timestamp(EVENT_END) + pd.Timedelta(days=PRICE_MARGIN_DAYS // 10))
+        self.alpha = dict(zip(self.tickers, rng.uniform(*ALPHA_RANGE, n_tickers)))
+        self.beta = dict(zip(self.tickers, rng.uniform(*BETA_RANGE, n_tickers)))
+        self.news = self._news(rng, n_events, duplicate_fraction)
+        self.prices = self._prices(rng)
+        fields = ["title", "description", "publishedAt", "url"]
+        self._articles = {t: rows[fields].to_dict("records") for t, rows in self.news.groupby("ticker")}
+
+    def _news(self, rng, n_events, duplicate_fraction):
+        vocab = _vocabulary(rng)
+        event_days = pd.bdate_range(EVENT_START, EVENT_END)
+        tickers = rng.choice(self.tickers, n_events)
+        days = event_days[rng.integers(0, len(event_days), n_events)]
+        labels = rng.choice(["positive", "negative", "neutral"], n_events, p=[0.4, 0.3, 0.3])
+        rows = []
+        for i, (ticker, day, label) in enumerate(zip(tickers, days, labels)):
+            filler = " ".join(rng.choice(vocab, 6))
+            keyword = ESG_KEYWORDS[i % len(ESG_KEYWORDS)]
+            verb = rng.choice(SENTIMENT_WORDS[label]) if label != "neutral" else "reports"
+            rows.append({
+                "ticker": ticker,
+                "title": f"{ticker} {verb} {keyword} {filler}",
+                "description": " ".join(rng.choice(vocab, 12)),
+                "publishedAt": f"{day:%Y-%m-%d}T{rng.integers(13, 21):02d}:00:00Z",
+                "url": f"https://news.example.com/{ticker.lower()}/{i}",
+                "label": label,
+            })
+        news = pd.DataFrame(rows)
+        # Syndicated copies: the same story under another ticker and URL
+        n_dup = int(len(news) * duplicate_fraction)
+        if n_dup:
+            copies = news.sample(n_dup, random_state=int(rng.integers(0, 2**31))).copy()
+            copies["ticker"] = rng.choice(self.tickers, n_dup)
+            copies["url"] = [f"{u}?syndicated={j}" for j, u in enumerate(copies["url"])]
+            news = pd.concat([news, copies], ignore_index=True)
+        return news
+
+    def _prices(self, rng):
+        n = len(self.dates)
+        market = rng.normal(MARKET_DRIFT, MARKET_VOL, n)
+        vix = np.clip(18 + np.cumsum(rng.normal(0, 0.1, n)) - 40 * (market - MARKET_DRIFT), 9, 80)
+        shocks = np.zeros((n, len(self.tickers)))
+        rows = self.dates.get_indexer(pd.to_datetime(self.news["publishedAt"].str[:10]))
+        cols = pd.Index(self.tickers).get_indexer(self.news["ticker"])
+        np.add.at(shocks, (rows, cols), self.news["label"].map(LABEL_SIGN).to_numpy() * ABNORMAL_RETURN)
+        prices = {
+            SP500_TICKER: _bars(4000 * np.cumprod(1 + market), self.dates),
+            VIX_TICKER: _bars(vix, self.dates),
+        }
+        for j, ticker in enumerate(self.tickers):
+            returns = (self.alpha[ticker] + self.beta[ticker] * market
+                       + rng.normal(0, IDIOSYNCRATIC_VOL, n) + shocks[:, j])
+            prices[ticker] = _bars(100 * np.cumprod(1 + returns), self.dates)
+        return prices
+
+    def articles(self, ticker):
+        """GNews-shaped article dicts for one ticker."""
+        return list(self._articles.get(ticker, []))
+
+    def portfolio(self):
+        return pd.DataFrame({"ticker": self.tickers})
+
+
+def _bars(close, dates):
+    close = np.asarray(close, dtype="float64")
+    return pd.DataFrame({"Open": close, "High": close * 1.005, "Low": close * 0.995, "Close": close,
+                         "Volume": np.full(len(close), 1e6)}, index=dates)
+
+
+class StubNewsClient:
+    """
+    GNewsClient stand-in: search_many() returns every synthetic article for
+    each ticker query. Each search is timed as an HTTP fetch, as in the client.
+    """
+
+    def __init__(self, market):
+        self.market = market
+        self.requests = 0
+
+    def search(self, query, max_articles=10):
+        self.requests += 1
+        with timed("ingest", "http_fetch"):
+            return self.market.articles(query.split(" ", 1)[0])
+
+    def search_many(self, queries, max_articles=10):
+        return {key: self.search(q, max_articles) for key, q in queries.items()}
+
+    def close(self):
+        pass
+
+
+class StubPriceProvider:
+    """YFinanceProvider stand-in over the synthetic bars. end is exclusive, as in yf.download."""
+
+    def __init__(self, market):
+        self.market = market
+        self.requests = 0
+
+    def fetch(self, symbol, start, end):
+        self.requests += 1
+        frame = self.market.prices.get(symbol)
+        if frame is None:
+            return pd.DataFrame()
+        return frame.loc[(frame.index >= pd.Timestamp(start)) & (frame.index < pd.Timestamp(end))].copy()
+
+    def fetch_many(self, symbols, start, end):
+        self.requests += 1
+        frames = {}
+        for s in symbols:
+            frame = self.market.prices.get(s)
+            if frame is not None:
+                frames[s] = frame.loc[(frame.index >= pd.Timestamp(start)) & (frame.index < pd.Timestamp(end))].copy()
+        return frames
+
+
+class KeywordSentimentModel:
+    """
+    FinBERT pipeline stand-in: labels a headline by the sentiment verbs the
+    synthetic news uses. Same call signature and output as the real pipeline.
+    """
+
+    def __init__(self):
+        self._labels = {w: label for label, words in SENTIMENT_WORDS.items() for w in words}
+        self.calls = 0
+
+    def __call__(self, texts, batch_size=None, truncation=True):
+        if isinstance(texts, str):
+            texts = [texts]
+        self.calls += 1
+        out = []
+        for text in texts:
+            label = next((self._labels[w] for w in text.lower().split() if w in self._labels), "neutral")
+            out.append({"label": label, "score": 0.9 if label != "neutral" else 0.6})
+        return out
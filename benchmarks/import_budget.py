@@ -0,0 +1,73 @@
+"""
+Import-time budget check for the pipeline entry points.
+
+Each module is imported in a fresh interpreter; the check fails if an import
+takes longer than the budget or drags in a heavy dependency that should only
+load on first use.
+
+    python benchmarks/import_budget.py [--budget 1.5] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODULES = ["pipeline", "models.sentiment_model", "models.regression_model", "src.mcp_api", "src.ingestion"]
+# Must stay deferred until a stage actually needs them
+HEAVY_MODULES = ["torch", "transformers", "statsmodels", "yfinance", "matplotlib", "streamlit", "sklearn"]
+DEFAULT_BUDGET_SECONDS = 1.5
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat):
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=REPO_ROOT, capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            return {"module": module, "error": out.stderr.strip().splitlines()[-1]}
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return dict(best, module=module)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="max seconds per import")
+    parser.add_argument("--repeat", type=int, default=3, help="imports per module; the fastest counts")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = [measure(m, args.repeat) for m in MODULES]
+    failed = False
+    for r in results:
+        if "error" in r:
+            status, failed = f"ERROR {r['error']}", True
+        elif r["heavy"]:
+            status, failed = f"FAIL eager import of {', '.join(r['heavy'])}", True
+        elif r["seconds"] > args.budget:
+            status, failed = f"FAIL over {args.budget:.2f}s budget", True
+        else:
+            status = "ok"
+        if not args.json:
+            seconds = f"{r['seconds']:.3f}s" if "seconds" in r else "-"
+            print(f"{r['module']:<28} {seconds:>8}  {status}")
+    if args.json:
+        print(json.dumps({"budget_seconds": args.budget, "results": results}, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+End-to-end pipeline benchmark on offline fixtures.
+
+Runs ingest -> score -> features -> regression on synthetic news and prices
+(benchmarks/fixtures.py) with stub GNews/yfinance providers and a keyword
+stand-in for FinBERT, at several event counts. Each scale runs in a fresh
+interpreter so its peak RSS is its own. Per stage it reports throughput,
+wall time, peak RSS and p50/p95/p99 latency of the stage's unit of work
+(HTTP fetch, inference batch, bulk price download, OLS fit) from the raw
+samples behind the src.metrics histograms; --output writes the results as
+JSON and --compare checks stage wall times against an earlier run.
+
+    python benchmarks/pipeline_bench.py [--scales 10 1000 100000] [--repeat 3]
+                                        [--output bench.json] [--compare baseline.json]
+"""
+import sys, os
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+
+import argparse
+import contextlib
+import json
+import math
+import platform
+import subprocess
+import tempfile
+import time
+
+DEFAULT_SCALES = [10, 1000, 100_000]
+STAGES = ["ingest", "score", "features", "regression"]
+# Per-request or per-batch sub-step whose latency histogram gives each stage's percentiles
+STAGE_STEPS = {"ingest": "http_fetch", "score": "inference_batch", "features": "price_download_bulk",
+               "regression": "ols_fit"}
+QUANTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+EVENTS_PER_TICKER = 200
+# Regression CIs are not what is being measured; keep the resample count modest
+BENCH_BOOTSTRAP = 100
+DEFAULT_TOLERANCE = 0.10
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scale(n_events, repeat, n_boot, events_per_ticker, seed=0):
+    """Benchmark every stage at one scale in this process; returns the stage rows and an accuracy check."""
+    import numpy as np
+    from pipeline import fetch_esg_news_for_portfolio, calculate_market_features
+    from models.sentiment_model import score_news_sentiment, set_sentiment_pipeline, set_sentiment_cache
+    from models.sentiment_cache import SentimentCache
+    from models.regression_model import run_regression
+    from src.artifacts import read_artifact
+    from src.price_store import PriceStore
+    from src.metrics import metrics, STAGE_SECONDS
+    from fixtures import SyntheticMarket, StubNewsClient, StubPriceProvider, KeywordSentimentModel, ABNORMAL_RETURN
+
+    # Exact per-step percentiles: the histogram buckets start at 1 ms, coarser than stub calls
+    metrics.keep_samples = True
+    market = SyntheticMarket(max(2, math.ceil(n_events / events_per_ticker)), n_events, seed)
+    set_sentiment_pipeline(KeywordSentimentModel())
+    seconds = {stage: [] for stage in STAGES}
+    rss = {}
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {name: os.path.join(tmp, f"{name}.parquet") for name in ("news", "scored", "features")}
+            portfolio_csv = os.path.join(tmp, "portfolio.csv")
+            market.portfolio().to_csv(portfolio_csv, index=False)
+            # Cold cache and price store each repeat, so every repeat does the same work
+            set_sentiment_cache(SentimentCache(os.path.join(tmp, "sentiment_cache.sqlite"), model_id="stand-in"))
+            store = PriceStore(os.path.join(tmp, "prices"), provider=StubPriceProvider(market))
+            stages = {
+                "ingest": lambda: fetch_esg_news_for_portfolio(portfolio_csv, paths["news"], client=StubNewsClient(market)),
+                "score": lambda: score_news_sentiment(paths["news"], paths["scored"]),
+                "features": lambda: calculate_market_features(paths["scored"], paths["features"], store=store),
+                "regression": lambda: run_regression(paths["features"], n_boot=n_boot),
+            }
+            for stage in STAGES:
+                # Logging stays unconfigured, as under the dashboard; stray prints go nowhere
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    start = time.perf_counter()
+                    stages[stage]()
+                    seconds[stage].append(time.perf_counter() - start)
+                rss[stage] = max(rss.get(stage, 0.0), peak_rss_mb())
+            features = read_artifact(paths["features"], "features")
+            items = {
+                "ingest": len(market.news),
+                "score": len(read_artifact(paths["scored"], "scored", columns=["ticker"])),
+                "features": len(features),
+                "regression": len(features),
+            }
+
+    timers = metrics.snapshot()["timers"]
+    rows = []
+    for stage in STAGES:
+        samples = np.array(seconds[stage])
+        wall = float(np.median(samples))
+        step = STAGE_STEPS[stage]
+        observed = np.array(metrics.samples(STAGE_SECONDS, stage=stage, step=step))
+        row = {
+            "scale": n_events,
+            "stage": stage,
+            "items": items[stage],
+            "seconds": samples.round(6).tolist(),
+            "wall_p50_seconds": wall,
+            "items_per_second": items[stage] / wall if wall > 0 else None,
+            "peak_rss_mb": round(rss[stage], 1),
+            # Latency of the stage's unit of work, over every repeat
+            "step": step,
+            "step_count": len(observed),
+        }
+        for name, q in QUANTILES.items():
+            row[f"{name}_seconds"] = float(np.percentile(observed, 100 * q)) if len(observed) else None
+        row["max_seconds"] = float(observed.max()) if len(observed) else None
+        rows.append(row)
+    # The fixture injects +/-ABNORMAL_RETURN on each event day; T+0 should recover it
+    day0 = features[features["window_day"] == 0]
+    accuracy = {"injected_abnormal_return": ABNORMAL_RETURN}
+    accuracy.update({
+        f"mean_t0_{label}": float(v) for label, v in day0.groupby("sentiment_label")["abnormal_return"].mean().items()
+    })
+    # Sub-step timers (HTTP fetch, price download, inference batch, OLS fit, ...) summed over the repeats
+    return {"scale": n_events, "tickers": len(market.tickers), "results": rows, "accuracy": accuracy,
+            "steps": timers}
+
+
+def run_worker(scale, args):
+    """Run one scale in a fresh interpreter and return its parsed result."""
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", str(scale), "--repeat", str(args.repeat),
+           "--n-bootstrap", str(args.n_bootstrap), "--events-per-ticker", str(args.events_per_ticker)]
+    out = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"scale": scale, "error": (out.stderr.strip().splitlines() or ["worker failed"])[-1]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True)
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def compare(report, baseline, tolerance):
+    """Print stage wall-time changes against a baseline report; True if any stage slowed down beyond tolerance."""
+    before = {(r["scale"], r["stage"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} (tolerance {tolerance:.0%}):")
+    slower = False
+    for r in report["results"]:
+        old = before.get((r["scale"], r["stage"]))
+        # Reports written before per-step percentiles kept the median wall time in p50_seconds
+        old_wall = old and old.get("wall_p50_seconds", old.get("p50_seconds"))
+        if not old_wall:
+            continue
+        ratio = r["wall_p50_seconds"] / old_wall
+        status = "ok"
+        if ratio > 1 + tolerance:
+            status, slower = "SLOWER", True
+        elif ratio < 1 - tolerance:
+            status = "faster"
+        print(f"  {r['scale']:>8} {r['stage']:<11} {old_wall:>9.3f}s -> {r['wall_p50_seconds']:>9.3f}s "
+              f"({ratio:.2f}x)  {status}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="news events per scale")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scale; wall time is their median")
+    parser.add_argument("--n-bootstrap", type=int, default=BENCH_BOOTSTRAP, help="regression bootstrap resamples")
+    parser.add_argument("--events-per-ticker", type=int, default=EVENTS_PER_TICKER)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="earlier --output file to compare stage wall times against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed wall-time slowdown")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_scale(args.worker, args.repeat, args.n_bootstrap, args.events_per_ticker)))
+        return 0
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {"repeat": args.repeat, "n_bootstrap": args.n_bootstrap,
+                     "events_per_ticker": args.events_per_ticker},
+        "results": [],
+        "accuracy": {},
+        "steps": {},
+        "errors": {},
+    }
+    for scale in args.scales:
+        result = run_worker(scale, args)
+        if "error" in result:
+            report["errors"][str(scale)] = result["error"]
+            if not args.json:
+                print(f"{scale:>8} events  ERROR {result['error']}")
+            continue
+        report["results"].extend(result["results"])
+        report["accuracy"][str(scale)] = result["accuracy"]
+        report["steps"][str(scale)] = result["steps"]
+        if not args.json:
+            print(f"{scale:>8} events, {result['tickers']} tickers")
+            for r in result["results"]:
+                print(f"  {r['stage']:<11} {r['items']:>9} items  {r['wall_p50_seconds']:>9.3f}s  "
+                      f"{r['items_per_second'] or 0:>11.1f}/s  peak RSS {r['peak_rss_mb']:>8.1f} MB")
+                if r["step_count"]:
+                    print(f"    {r['step']:<20} x{r['step_count']:<7} " + "  ".join(
+                        f"{name} {r[f'{name}_seconds'] * 1000:>9.3f}ms" for name in QUANTILES))
+            acc = result["accuracy"]
+            recovered = ", ".join(f"{k[len('mean_t0_'):]} {v:+.4f}" for k, v in acc.items() if k.startswith("mean_t0_"))
+            print(f"  T+0 abnormal return (injected +/-{acc['injected_abnormal_return']:.4f}): {recovered}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    failed = bool(report["errors"])
+    if args.compare:
+        with open(args.compare) as f:
+            failed = compare(report, json.load(f), args.tolerance) or failed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
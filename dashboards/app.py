@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import io
 import os
 import time
 import sys
@@ -9,21 +10,148 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 
 # Import your pipeline functions
-from pipeline import fetch_esg_news_for_portfolio, calculate_market_features
-from models.sentiment_model import score_news_sentiment
-from models.regression_model import run_regression
+from models.sentiment_model import warm_up, get_sentiment_pipeline
+from models.regression_model import load_factor_data
+from src.artifacts import read_artifact
+from src.jobs import get_job_runner
+from src.planner import PortfolioPlan, max_portfolio_size
+
+POLL_SECONDS = 0.5
 
 st.set_page_config(page_title="ESG Pulse", layout="wide")
 st.title("🌿 ESG Pulse – Sentiment & Stock Impact Tracker")
 
+
+# --- Cached resources and data ---
+# Cached data is keyed on the features hash a job records when it finishes, so
+# reruns triggered by unrelated widgets read nothing from disk, and a new
+# pipeline run (new hash) recomputes it.
+@st.cache_resource(show_spinner="Loading FinBERT...")
+def load_sentiment_model():
+    # One model per server process, shared by every session
+    warm_up()
+    return get_sentiment_pipeline()
+
+@st.cache_data(show_spinner=False)
+def load_features(path, features_hash):
+    return load_factor_data(path).df
+
+@st.cache_data(show_spinner=False)
+def load_raw_features(path, features_hash):
+    return read_artifact(path, "features")
+
+@st.cache_data(show_spinner=False)
+def category_table(path, features_hash):
+    df = load_features(path, features_hash)
+    return df.groupby('sentiment_category', observed=False)['abnormal_return'].agg(['mean', 'std', 'count'])
+
+@st.cache_data(show_spinner=False)
+def ticker_table(results):
+    by_ticker = results.get('group_coefficients', {}).get('ticker', {})
+    return pd.DataFrame({
+        ticker: {
+            'sentiment_coef': fit['coefficients']['sentiment_score'],
+            'ci_low': fit['ci']['sentiment_score'][0],
+            'ci_high': fit['ci']['sentiment_score'][1],
+            'observations': fit['n_observations'],
+        }
+        for ticker, fit in by_ticker.items()
+    }).T
+
+@st.cache_data(show_spinner=False)
+def figure_png(path, features_hash, kind):
+    """Render one figure to PNG bytes; cached so reruns skip matplotlib entirely."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    df = load_features(path, features_hash)
+    fig, ax = plt.subplots()
+    if kind == "histogram":
+        df['abnormal_return'].hist(bins=30, ax=ax)
+        ax.set_xlabel('Abnormal Return')
+        ax.set_ylabel('Frequency')
+    else:
+        df.boxplot(column='abnormal_return', by='sentiment_category', ax=ax)
+        fig.suptitle('')
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=120, bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False)
+def features_csv(path, features_hash):
+    return load_features(path, features_hash).to_csv(index=False)
+
+
+def follow_job(job):
+    """Stream the job's stage progress into a status box until it finishes."""
+    with st.status(f"ESG analysis for {', '.join(job.tickers)}", expanded=not job.done) as status:
+        seen = 0
+        while True:
+            events = job.events(seen)
+            for event in events:
+                st.write(f"**{event['stage']}** – {event['message']}")
+            seen += len(events)
+            if job.done and not job.events(seen):
+                break
+            time.sleep(POLL_SECONDS)
+        if job.state == "done":
+            status.update(label=f"ESG analysis for {', '.join(job.tickers)} finished in "
+                                f"{job.finished - job.submitted:.1f}s", state="complete", expanded=False)
+        else:
+            status.update(label="ESG analysis failed", state="error", expanded=True)
+            st.code(job.error)
+
+def show_results(features_path, features_hash, results):
+    st.subheader("📊 Regression Summary")
+    st.text(results['model_summary'])
+
+    # Show key findings
+    st.markdown("### Key Findings")
+    st.write(f"**Sentiment Impact:** {results['sentiment_coef']:.6f} (p={results['sentiment_pvalue']:.4f})")
+    st.write(f"**R-squared:** {results['r_squared']:.4f}")
+    st.write(f"**Observations:** {results['n_observations']}")
+    if 'bootstrap_ci' in results:
+        lo, hi = results['bootstrap_ci']['sentiment_score']
+        st.write(f"**Sentiment 95% CI (bootstrap):** [{lo:.6f}, {hi:.6f}]")
+        by_ticker = ticker_table(results)
+        if len(by_ticker):
+            st.markdown("### Sentiment Impact by Ticker")
+            st.write(by_ticker)
+
+    # Show analysis by sentiment category
+    st.markdown("### Abnormal Returns by Sentiment Category")
+    st.write(category_table(features_path, features_hash))
+
+    # Plots
+    st.markdown("### Distribution of Abnormal Returns")
+    st.image(figure_png(features_path, features_hash, "histogram"))
+
+    st.markdown("### Abnormal Returns by Sentiment Category")
+    st.image(figure_png(features_path, features_hash, "boxplot"))
+
+    # Download button
+    st.download_button(
+        label="Download Market Features as CSV",
+        data=features_csv(features_path, features_hash),
+        file_name='market_features.csv',
+        mime='text/csv'
+    )
+
+
 # --- Portfolio Input ---
 st.sidebar.header("Portfolio Setup")
-ticker_input = st.sidebar.text_input("Enter up to 3 comma-separated stock tickers", "AAPL,MSFT,TSLA")
-tickers = [t.strip().upper() for t in ticker_input.split(",") if t.strip()]
-
-if len(tickers) > 3:
-    st.sidebar.error("Please enter no more than 3 tickers.")
-    tickers = tickers[:3]
+# Largest portfolio that fits the interactive budget at the measured throughput
+max_tickers = max_portfolio_size()
+ticker_input = st.sidebar.text_area(f"Enter up to {max_tickers} comma-separated stock tickers", "AAPL,MSFT,TSLA")
+tickers = list(dict.fromkeys(t.strip().upper() for t in ticker_input.replace("\n", ",").split(",") if t.strip()))
+
+if len(tickers) > max_tickers:
+    st.sidebar.error(f"Please enter no more than {max_tickers} tickers.")
+    tickers = tickers[:max_tickers]
+if tickers:
+    plan = PortfolioPlan(tickers)
+    st.sidebar.caption(f"Estimated runtime: ~{plan.estimate()['total']:.0f}s. {plan.describe()}")
 
 if st.sidebar.button("Save Portfolio"):
     os.makedirs("data", exist_ok=True)
@@ -31,86 +159,34 @@ if st.sidebar.button("Save Portfolio"):
     st.sidebar.success("Portfolio saved to data/user_portfolio.csv!")
 
 st.sidebar.header("Settings")
+incremental = st.sidebar.checkbox("Only process new articles", value=True,
+                                  help="Reuse previous results for articles and events already processed.")
 run_analysis = st.sidebar.button("Run ESG Analysis")
 
 # --- Main Analysis ---
+# Runs go to a shared worker pool, each in its own data/runs/<portfolio> directory;
+# identical portfolios share one run and the script only follows its progress
+runner = get_job_runner()
 if run_analysis:
     if len(tickers) == 0:
         st.error("Please enter at least one ticker.")
-    elif len(tickers) > 3:
-        st.error("Please enter no more than 3 tickers.")
+    elif len(tickers) > max_tickers:
+        st.error(f"Please enter no more than {max_tickers} tickers.")
     else:
-        st.success("Running full ESG sentiment analysis pipeline...")
-
-        # 1. Save portfolio
-        os.makedirs("data", exist_ok=True)
-        pd.DataFrame({"ticker": tickers}).to_csv("data/user_portfolio.csv", index=False)
-        st.info("Portfolio saved.")
-
-        # 2. Fetch ESG news
-        with st.spinner("Fetching ESG news..."):
-            fetch_esg_news_for_portfolio()
-            st.success("News fetched!")
-
-        # 3. Score sentiment
-        with st.spinner("Scoring sentiment..."):
-            score_news_sentiment("data/sample_news.csv", "data/sample_news_scored.csv")
-            st.success("Sentiment scored!")
-
-        # 4. Generate market features
-        with st.spinner("Generating market features..."):
-            calculate_market_features("data/sample_news_scored.csv", "data/market_features.csv")
-            st.success("Market features generated!")
-
-        # 5. Run regression
-        with st.spinner("Running regression analysis..."):
-            model, results = run_regression()
-            if results:
-                st.subheader("📊 Regression Summary")
-                st.text(results['model_summary'])
-
-                # Show key findings
-                st.markdown("### Key Findings")
-                st.write(f"**Sentiment Impact:** {results['sentiment_coef']:.6f} (p={results['sentiment_pvalue']:.4f})")
-                st.write(f"**R-squared:** {results['r_squared']:.4f}")
-                st.write(f"**Observations:** {results['n_observations']}")
-
-                # Show analysis by sentiment category
-                df = pd.read_csv("data/market_features.csv")
-                df['sentiment_category'] = pd.cut(df['sentiment_score'], bins=[-float('inf'), 0.3, 0.7, float('inf')], labels=['Negative', 'Neutral', 'Positive'])
-                st.markdown("### Abnormal Returns by Sentiment Category")
-                st.write(df.groupby('sentiment_category')['abnormal_return'].agg(['mean', 'std', 'count']))
-
-                # Plots
-                import matplotlib.pyplot as plt
-                st.markdown("### Distribution of Abnormal Returns")
-                fig1, ax1 = plt.subplots()
-                df['abnormal_return'].hist(bins=30, ax=ax1)
-                ax1.set_xlabel('Abnormal Return')
-                ax1.set_ylabel('Frequency')
-                st.pyplot(fig1)
-
-                st.markdown("### Abnormal Returns by Sentiment Category")
-                fig2, ax2 = plt.subplots()
-                df.boxplot(column='abnormal_return', by='sentiment_category', ax=ax2)
-                plt.suptitle('')
-                st.pyplot(fig2)
-
-                # Download button
-                st.download_button(
-                    label="Download Market Features as CSV",
-                    data=df.to_csv(index=False),
-                    file_name='market_features.csv',
-                    mime='text/csv'
-                )
-            else:
-                st.error("No regression results available. Please ensure you have valid data.")
+        load_sentiment_model()
+        st.session_state["job_id"] = runner.submit(tickers, incremental).id
 
+job = runner.get(st.session_state.get("job_id"))
+if job is None:
+    st.info(f"Use the sidebar to input up to {max_tickers} tickers and run analysis.")
 else:
-    st.info("Use the sidebar to input up to 3 tickers and run analysis.")
-
-# --- Optionally, show raw data ---
-if os.path.exists('data/market_features.csv'):
-    with st.expander("Show raw market features data"):
-        df = pd.read_csv('data/market_features.csv')
-        st.dataframe(df)
\ No newline at end of file
+    follow_job(job)
+    if job.state == "done" and job.results:
+        show_results(job.features_path, job.features_hash, job.results)
+    elif job.state == "done":
+        st.error("No regression results available. Please ensure you have valid data.")
+
+    # --- Optionally, show raw data ---
+    if job.features_hash is not None:
+        with st.expander("Show raw market features data"):
+            st.dataframe(load_raw_features(job.features_path, job.features_hash))
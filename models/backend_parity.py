@@ -0,0 +1,49 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+import numpy as np
+from models.backends import load_sentiment_pipeline, BACKENDS
+from src.artifacts import read_artifact
+
+MIN_LABEL_AGREEMENT = 0.95
+MAX_MEAN_SCORE_DIFF = 0.02
+
+def run_backend(backend, texts, batch_size):
+    pipe = load_sentiment_pipeline(backend)
+    start = time.perf_counter()
+    outputs = pipe(texts, batch_size=batch_size, truncation=True)
+    elapsed = time.perf_counter() - start
+    return [o["label"] for o in outputs], np.array([o["score"] for o in outputs]), elapsed
+
+def check_parity(backend, input_path="data/sample_news.csv", batch_size=32):
+    """
+    Score the sample headlines with the fp32 pipeline and with `backend`,
+    and compare labels and scores. Returns True if the backend is within
+    MIN_LABEL_AGREEMENT and MAX_MEAN_SCORE_DIFF of the reference.
+    """
+    texts = read_artifact(input_path, "news", columns=["title"])["title"].fillna("").astype(str).tolist()
+    ref_labels, ref_scores, ref_time = run_backend("pytorch", texts, batch_size)
+    labels, scores, elapsed = run_backend(backend, texts, batch_size)
+
+    agreement = np.mean([a == b for a, b in zip(ref_labels, labels)])
+    diff = np.abs(ref_scores - scores)
+    print(f"Backend: {backend} vs pytorch fp32 on {len(texts)} headlines")
+    print(f"Label agreement: {agreement:.2%}")
+    print(f"Score difference: mean={diff.mean():.4f}, max={diff.max():.4f}")
+    print(f"Inference time: fp32={ref_time:.2f}s, {backend}={elapsed:.2f}s")
+    for text, a, b in zip(texts, ref_labels, labels):
+        if a != b:
+            print(f"  MISMATCH {a} -> {b}: {text[:80]}")
+    ok = agreement >= MIN_LABEL_AGREEMENT and diff.mean() <= MAX_MEAN_SCORE_DIFF
+    print("✅ PARITY OK" if ok else "❌ PARITY FAILED")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare a FinBERT backend against the fp32 pipeline")
+    parser.add_argument("backend", choices=[b for b in BACKENDS if b != "pytorch"])
+    parser.add_argument("--input", default="data/sample_news.csv")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+    sys.exit(0 if check_parity(args.backend, args.input, args.batch_size) else 1)
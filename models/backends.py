@@ -0,0 +1,34 @@
+FINBERT_MODEL = "ProsusAI/finbert"
+FINBERT_REVISION = "main"
+
+# pytorch: stock fp32 pipeline; int8: dynamically quantized Linear layers;
+# onnx: ONNX Runtime export (needs `pip install optimum[onnxruntime]`)
+BACKENDS = ("pytorch", "int8", "onnx")
+
+
+def load_sentiment_pipeline(backend="pytorch", model_id=FINBERT_MODEL, revision=FINBERT_REVISION):
+    """
+    Build a sentiment-analysis pipeline on the requested CPU backend. Every
+    backend returns the same [{"label", "score"}] output as the fp32 pipeline.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown sentiment backend {backend!r}; expected one of {BACKENDS}")
+    # Deferred so importing this module never pulls in torch/transformers
+    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+    if backend == "pytorch":
+        return pipeline("sentiment-analysis", model=model_id, revision=revision)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id, revision=revision)
+    if backend == "int8":
+        import torch
+        model = AutoModelForSequenceClassification.from_pretrained(model_id, revision=revision)
+        model.eval()
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError as e:
+        raise ImportError("The onnx sentiment backend requires optimum[onnxruntime]") from e
+    model = ORTModelForSequenceClassification.from_pretrained(model_id, revision=revision, export=True)
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
@@ -0,0 +1,124 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import multiprocessing as mp
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from src.artifacts import apply_schema, resolve_artifact
+
+BACKFILL_CHUNK_ROWS = 20_000
+PROGRESS_FILE = "progress.json"
+
+def iter_chunks(path, chunk_rows):
+    """Stream a news artifact in fixed-size chunks without loading it whole."""
+    path = resolve_artifact(path)
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        for chunk in pd.read_csv(path, chunksize=chunk_rows):
+            yield apply_schema(chunk, "news")
+
+def _init_worker(threads):
+    # Runs once per process: pin the thread share, then load the model once
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    from models.sentiment_model import warm_up
+    warm_up()
+
+def _score_chunk(chunk, batch_size, use_cache):
+    from models.sentiment_model import score_texts
+    scored = score_texts(chunk["title"].tolist(), batch_size=batch_size, use_cache=use_cache)
+    chunk = chunk.copy()
+    chunk["sentiment_label"] = [label for label, _ in scored]
+    chunk["sentiment_score"] = [score for _, score in scored]
+    return chunk
+
+class BackfillProgress:
+    """Completed shard indices for one backfill output directory."""
+
+    def __init__(self, output_dir, input_path, chunk_rows):
+        self.path = os.path.join(output_dir, PROGRESS_FILE)
+        self.done = set()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            if state["input"] != os.path.abspath(input_path) or state["chunk_rows"] != chunk_rows:
+                raise ValueError(f"{output_dir} holds a backfill of a different input or chunk size; "
+                                 "use a new output directory")
+            self.done = set(state["done"])
+        self.state = {"input": os.path.abspath(input_path), "chunk_rows": chunk_rows}
+
+    def mark(self, shard):
+        self.done.add(shard)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(dict(self.state, done=sorted(self.done)), f)
+        os.replace(tmp, self.path)
+
+def shard_path(output_dir, shard):
+    return os.path.join(output_dir, f"shard-{shard:06d}.parquet")
+
+def backfill_sentiment(input_path, output_dir, workers=None, chunk_rows=BACKFILL_CHUNK_ROWS,
+                       batch_size=32, use_cache=True):
+    """
+    Score a large news history across a process pool. Each worker loads the
+    model once with cpu_count // workers threads. Chunk i is written to
+    shard-i.parquet in input order and recorded in progress.json, so a
+    restarted backfill skips every shard that already finished.
+    """
+    workers = workers or max(1, (os.cpu_count() or 1) // 2)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    os.makedirs(output_dir, exist_ok=True)
+    progress = BackfillProgress(output_dir, input_path, chunk_rows)
+    print(f"Backfill: {workers} workers x {threads} threads, {len(progress.done)} shards already done")
+
+    started, rows_scored = time.time(), 0
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        # At most 2 chunks per worker in flight keeps memory bounded
+        pending = deque()
+
+        def drain(limit):
+            nonlocal rows_scored
+            while len(pending) > limit:
+                shard, future = pending.popleft()
+                scored = future.result()
+                path = shard_path(output_dir, shard)
+                # Shards keep input row order, so no ticker/date sort here
+                apply_schema(scored, "scored").to_parquet(path + ".tmp", index=False)
+                os.replace(path + ".tmp", path)
+                progress.mark(shard)
+                rows_scored += len(scored)
+                rate = rows_scored / max(time.time() - started, 1e-9)
+                print(f"  shard {shard}: {len(scored)} rows ({rate:,.0f} rows/s)")
+
+        for shard, chunk in enumerate(iter_chunks(input_path, chunk_rows)):
+            if shard in progress.done and os.path.exists(shard_path(output_dir, shard)):
+                continue
+            pending.append((shard, pool.submit(_score_chunk, chunk, batch_size, use_cache)))
+            drain(2 * workers)
+        drain(0)
+    print(f"Backfill complete: {rows_scored} rows scored in {time.time() - started:.1f}s, "
+          f"{len(progress.done)} shards in {output_dir}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-process FinBERT backfill over a large news history")
+    parser.add_argument("input", help="news artifact (.parquet or .csv) with a title column")
+    parser.add_argument("output_dir", help="directory for shard-*.parquet outputs and progress.json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=BACKFILL_CHUNK_ROWS)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--no-cache", action="store_true", help="skip the shared sentiment cache")
+    args = parser.parse_args()
+    backfill_sentiment(args.input, args.output_dir, args.workers, args.chunk_rows, args.batch_size,
+                       use_cache=not args.no_cache)
@@ -0,0 +1,96 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src.metrics import get_logger, timed
+
+logger = get_logger("factor_model")
+
+TARGET = "abnormal_return"
+DEFAULT_FACTORS = ["sentiment_score", "vix", "momentum"]
+# ESG pillar hit counts from the keyword matcher; opt-in
+ESG_FACTORS = ["e_hits", "s_hits", "g_hits"]
+# Derived market factors from src.market_factors, carried on the feature rows; opt-in
+MARKET_FACTORS = ["vix_change", "market_vol"]
+# Dropped from the model instead of dropping rows when the column is absent or entirely NaN
+OPTIONAL_FACTORS = ("vix", *ESG_FACTORS, *MARKET_FACTORS)
+
+
+class FactorData:
+    """A cleaned observation frame and the design matrix built from it once."""
+
+    def __init__(self, df, factors, target=TARGET):
+        self.df = df
+        self.factors = list(factors)
+        self.target = target
+        X = df[self.factors].astype("float64")
+        X.insert(0, "const", 1.0)
+        self.X = X
+        self.y = df[target].astype("float64")
+
+    @property
+    def formula(self):
+        return f"{self.target} ~ " + " + ".join(self.factors)
+
+    def __len__(self):
+        return len(self.df)
+
+    def fit(self):
+        import statsmodels.api as sm
+        with timed("regression", "ols_fit"):
+            return sm.OLS(self.y, self.X).fit()
+
+
+class FactorModel:
+    """
+    Declared factor columns for the abnormal-return regression. prepare()
+    is the single missing-data pass shared by the CLI, the dashboard and
+    the API: optional factors without data are dropped, then rows missing
+    the target or any remaining factor are dropped.
+    """
+
+    def __init__(self, factors=None, target=TARGET, optional=OPTIONAL_FACTORS):
+        self.factors = list(factors or DEFAULT_FACTORS)
+        self.target = target
+        self.optional = tuple(optional)
+
+    def prepare(self, df, verbose=False):
+        factors = [
+            f for f in self.factors
+            if f not in self.optional or (f in df.columns and df[f].notna().any())
+        ]
+        dropped = [f for f in self.factors if f not in factors]
+        required = [self.target] + factors
+        # The missing-value scan is only worth doing when someone reads it
+        if verbose and logger.isEnabledFor(logging.DEBUG):
+            missing = df.reindex(columns=required).isna().sum()
+            for col, count in missing.items():
+                if count > 0:
+                    logger.debug("  %s: %d missing values", col, count)
+        if verbose and dropped:
+            logger.info("Dropping factors without data: %s", ", ".join(dropped))
+        df_clean = df.dropna(subset=required).copy()
+        return FactorData(df_clean, factors, self.target)
+
+    @classmethod
+    def from_arrays(cls, target, **columns):
+        """
+        Build (model, frame) from equal-length arrays; 2-D arrays expand into
+        one numbered factor per column (e.g. sector dummies).
+        """
+        frame = {TARGET: np.asarray(target, dtype="float64")}
+        factors = []
+        for name, values in columns.items():
+            values = np.asarray(values, dtype="float64")
+            if values.ndim == 2:
+                for i in range(values.shape[1]):
+                    frame[f"{name}_{i}"] = values[:, i]
+                    factors.append(f"{name}_{i}")
+            else:
+                frame[name] = values
+                factors.append(name)
+        return cls(factors, optional=()), pd.DataFrame(frame)
+
+
+DEFAULT_MODEL = FactorModel()
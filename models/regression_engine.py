@@ -0,0 +1,130 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+N_BOOTSTRAP = 2000
+# Memory for one stacked bootstrap call; resamples per call = budget / bytes per (n,) weight row
+BOOTSTRAP_MEMORY_BYTES = 256 * 1024 * 1024
+CI_LEVEL = 0.95
+ROLLING_WINDOW = 60
+MIN_GROUP_OBS = 10
+PARALLEL_MIN_GROUPS = 8  # below this a process pool costs more than it saves
+
+
+def solve_stacked(gram, rhs):
+    """Solve a stack of normal equations; singular systems fall back to the pseudo-inverse."""
+    try:
+        return np.linalg.solve(gram, rhs[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        return np.einsum("bkl,bl->bk", np.linalg.pinv(gram), rhs)
+
+
+def ols(X, y):
+    return np.linalg.lstsq(X, y, rcond=None)[0]
+
+
+def weighted_ols_batch(X, y, weights):
+    """
+    One OLS fit per row of weights (B, n) from a single pair of matrix
+    products: the B Gram matrices X'WX and moment vectors X'Wy are built
+    together and solved as one stacked system. Nothing larger than the
+    weights and the (n, k, k) row outer products is allocated.
+    """
+    n, k = X.shape
+    outer = (X[:, :, None] * X[:, None, :]).reshape(n, k * k)
+    gram = (weights @ outer).reshape(-1, k, k)
+    rhs = weights @ (X * y[:, None])
+    return solve_stacked(gram, rhs)
+
+
+def bootstrap_chunk(n_rows, n_clusters, memory_bytes=BOOTSTRAP_MEMORY_BYTES):
+    """Resamples per stacked call so its (B, n_clusters) counts and (B, n_rows) weights fit in memory_bytes."""
+    # int64 counts, their float64 copy and the float64 per-row weights
+    row_bytes = 8 * (2 * n_clusters + n_rows)
+    return max(1, int(memory_bytes // max(row_bytes, 1)))
+
+
+def bootstrap_coefficients(X, y, n_boot=N_BOOTSTRAP, clusters=None, seed=0, chunk=None):
+    """
+    Pairs bootstrap as multinomial resampling weights. With clusters (one
+    label per row) whole clusters are resampled, which keeps the rows of
+    one event window together. chunk (resamples per stacked call) defaults
+    to what fits in BOOTSTRAP_MEMORY_BYTES. Returns a (n_boot, k) coefficient array.
+    """
+    rng = np.random.default_rng(seed)
+    if clusters is None:
+        codes, n_clusters = None, len(y)
+    else:
+        codes, uniques = pd.factorize(clusters)
+        n_clusters = len(uniques)
+    chunk = chunk or bootstrap_chunk(len(y), n_clusters)
+    draws = []
+    for start in range(0, n_boot, chunk):
+        size = min(chunk, n_boot - start)
+        counts = rng.multinomial(n_clusters, np.full(n_clusters, 1.0 / n_clusters), size=size).astype("float64")
+        weights = counts if codes is None else counts[:, codes]
+        draws.append(weighted_ols_batch(X, y, weights))
+        # Free this chunk before drawing the next, so only one is ever alive
+        del counts, weights
+    return np.concatenate(draws)
+
+
+def percentile_ci(draws, level=CI_LEVEL):
+    alpha = (1 - level) / 2
+    return np.nanquantile(draws, [alpha, 1 - alpha], axis=0).T
+
+
+def rolling_coefficients(X, y, window=ROLLING_WINDOW):
+    """
+    Coefficients of every length-window fit over rows already in time order.
+    Each window's Gram matrix is a difference of prefix sums, so the cost is
+    O(n k^2) plus one stacked solve instead of n separate fits.
+    """
+    n, k = X.shape
+    if n < window:
+        return np.empty((0, k))
+    gram_cum = np.concatenate([np.zeros((1, k, k)), np.cumsum(X[:, :, None] * X[:, None, :], axis=0)])
+    rhs_cum = np.concatenate([np.zeros((1, k)), np.cumsum(X * y[:, None], axis=0)])
+    return solve_stacked(gram_cum[window:] - gram_cum[:-window], rhs_cum[window:] - rhs_cum[:-window])
+
+
+def _fit_group(args):
+    name, X, y, clusters, n_boot, seed = args
+    coef = ols(X, y)
+    ci = percentile_ci(bootstrap_coefficients(X, y, n_boot, clusters, seed))
+    return name, coef, ci, len(y)
+
+
+def grouped_fits(X, y, groups, names, n_boot=N_BOOTSTRAP, clusters=None,
+                 min_obs=MIN_GROUP_OBS, workers=None, seed=0):
+    """
+    OLS plus bootstrap CI for the rows of each group label, sliced from one
+    shared design matrix. Groups are fitted on a process pool once there are
+    enough of them to amortise its start-up.
+    Returns {group: {"n_observations", "coefficients": {name: coef}, "ci": {name: [lo, hi]}}}.
+    """
+    codes, labels = pd.factorize(np.asarray(groups), sort=True)
+    tasks = []
+    for code, label in enumerate(labels):
+        rows = codes == code
+        if rows.sum() < max(min_obs, len(names) + 1):
+            continue
+        tasks.append((str(label), X[rows], y[rows], None if clusters is None else clusters[rows], n_boot, seed))
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    if workers > 1 and len(tasks) >= PARALLEL_MIN_GROUPS:
+        # Spawn, as in backfill: forking a process that runs dashboard or API threads can deadlock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+            fitted = list(pool.map(_fit_group, tasks))
+    else:
+        fitted = [_fit_group(task) for task in tasks]
+    return {
+        name: {
+            "n_observations": n,
+            "coefficients": dict(zip(names, coef.tolist())),
+            "ci": {c: bounds.tolist() for c, bounds in zip(names, ci)},
+        }
+        for name, coef, ci, n in fitted
+    }
@@ -1,201 +1,188 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import logging
 import pandas as pd
-import statsmodels.api as sm
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-import matplotlib.pyplot as plt
+from src.artifacts import read_artifact, resolve_artifact
+from src.checkpoints import manifest_for, file_hash
+from models.factor_model import DEFAULT_MODEL, DEFAULT_FACTORS, ESG_FACTORS, MARKET_FACTORS, FactorModel
+from models.regression_engine import (
+    bootstrap_coefficients, percentile_ci, rolling_coefficients, grouped_fits,
+    N_BOOTSTRAP, ROLLING_WINDOW, CI_LEVEL
+)
+from src.metrics import get_logger, configure_logging, timed, count, LOG_LEVEL
+
+logger = get_logger("regression")
+
+# ticker,sector CSV joined onto the features for the per-sector fits
+SECTOR_MAP_PATH = "data/ticker_sectors.csv"
+UNKNOWN_SECTOR = "Unknown"
 
-def run_regression(input_csv="data/market_features.csv"):
+def load_sector_map(path=SECTOR_MAP_PATH):
+    """{ticker: sector} from a ticker,sector CSV, or None when there is no such file."""
+    if not path or not os.path.exists(path):
+        return None
+    sectors = pd.read_csv(path, dtype=str).dropna(subset=["ticker", "sector"])
+    return dict(zip(sectors["ticker"].str.strip().str.upper(), sectors["sector"].str.strip()))
+
+def load_factor_data(input_path="data/market_features.parquet", factor_model=DEFAULT_MODEL,
+                     sector_map_path=SECTOR_MAP_PATH):
     """
-    Run multi-factor regression to analyze ESG sentiment impact on abnormal returns
+    Load market features once and run the factor model's missing-data pass.
+    Tickers get their sector from sector_map_path when that file exists.
     """
-    print("Loading market features data...")
-    df = pd.read_csv(input_csv)
-    print(f"Loaded {len(df)} observations")
-    
-    # Data preprocessing
-    print("\nData preprocessing...")
-    # Convert sentiment_score to numeric (handle string values)
-    df['sentiment_score'] = pd.to_numeric(df['sentiment_score'], errors='coerce')
-    
-    # Check for missing values before dropping
-    print("\nMissing values in each column:")
-    missing_counts = df.isnull().sum()
-    for col, count in missing_counts.items():
-        if count > 0:
-            print(f"  {col}: {count} missing values")
-    
-    # Show sample of data
-    print("\nSample of data (first 5 rows):")
-    print(df[["abnormal_return", "sentiment_score", "momentum"]].head())
+    df = read_artifact(input_path, "features")
+    sectors = load_sector_map(sector_map_path)
+    if sectors is not None:
+        df["sector"] = df["ticker"].astype(str).str.upper().map(sectors).fillna(UNKNOWN_SECTOR)
+    else:
+        logger.info("No ticker-sector map at %s; skipping per-sector fits", sector_map_path)
+    logger.info("Loaded %d observations from %s", len(df), input_path)
+    logger.debug("Missing values in each column:")
+    data = factor_model.prepare(df, verbose=True)
+    logger.info("After dropping missing values: %d observations", len(data))
+    data.df['sentiment_category'] = pd.cut(data.df['sentiment_score'],
+                                           bins=[-np.inf, 0.3, 0.7, np.inf],
+                                           labels=['Negative', 'Neutral', 'Positive'])
+    return data
 
-    
-    # Drop rows with missing values
-    df_clean = df.dropna(subset=["abnormal_return", "sentiment_score", "momentum"])
+@timed("regression")
+def run_regression(input_path="data/market_features.parquet", incremental=False, data=None, factor_model=DEFAULT_MODEL,
+                   n_boot=N_BOOTSTRAP):
+    """
+    Run multi-factor regression to analyze ESG sentiment impact on abnormal returns.
+    Pass data (from load_factor_data) to reuse an already loaded and cleaned frame;
+    n_boot sets the bootstrap resamples behind the confidence intervals.
+    In incremental mode the fit is skipped when the input file is unchanged and
+    the previous results are returned with model=None.
+    """
+    manifest = manifest_for("regression", input_path)
+    results_path = os.path.join(os.path.dirname(manifest.path), "regression_results.json")
+    fingerprint = file_hash(resolve_artifact(input_path))
+    fingerprint = f"{fingerprint}:{','.join(factor_model.factors)}"
+    if os.path.exists(SECTOR_MAP_PATH):
+        fingerprint = f"{fingerprint}:{file_hash(SECTOR_MAP_PATH)}"
+    if incremental and manifest.entries.get("input") == fingerprint and os.path.exists(results_path):
+        logger.info("Market features unchanged since last run; reusing regression results")
+        with open(results_path) as f:
+            return None, json.load(f)
+    model, results = _fit_regression(data if data is not None else load_factor_data(input_path, factor_model), n_boot)
+    if results is not None:
+        manifest.update(["input"], [fingerprint])
+        manifest.save()
+        with open(results_path, "w") as f:
+            json.dump(results, f, default=float)
+    return model, results
 
-    print(f"After dropping missing values: {len(df_clean)} observations")
-    
-    if len(df_clean) == 0:
-        print("\nTrying regression without VIX...")
-        df_clean = df.dropna(subset=["abnormal_return", "sentiment_score", "momentum"])
-        print(f"After dropping missing values (without VIX): {len(df_clean)} observations")
-        
-        if len(df_clean) == 0:
-            print("\nERROR: No data left after dropping missing values!")
-            print("This means all rows have at least one missing value in the required columns.")
-            return None, None
-        
-        # Run regression without VIX
-        X = df_clean[["sentiment_score", "momentum"]]
-        y = df_clean["abnormal_return"]
-        X = sm.add_constant(X)
-        
-        # Create sentiment categories for analysis
-        df_clean['sentiment_category'] = pd.cut(df_clean['sentiment_score'], 
-                                              bins=[-np.inf, 0.3, 0.7, np.inf], 
-                                              labels=['Negative', 'Neutral', 'Positive'])
-        
-        print("\nRunning regression analysis (without VIX)...")
-        print("Model: abnormal_return ~ sentiment_score + momentum")
-        
-        model = sm.OLS(y, X).fit()
-        
-        # Print results
-        print("\n" + "="*60)
-        print("REGRESSION RESULTS (WITHOUT VIX)")
-        print("="*60)
-        print(model.summary())
-        
-        # Interpret key results
-        print("\n" + "="*60)
-        print("KEY FINDINGS")
-        print("="*60)
-        
-        # Sentiment impact
-        sentiment_coef = model.params['sentiment_score']
-        sentiment_pvalue = model.pvalues['sentiment_score']
-        print(f"Sentiment Impact: {sentiment_coef:.6f}")
-        print(f"P-value: {sentiment_pvalue:.6f}")
-        
-        if sentiment_pvalue < 0.05:
-            if sentiment_coef > 0:
-                print("✅ SIGNIFICANT: Positive ESG sentiment is associated with higher abnormal returns")
-            else:
-                print("✅ SIGNIFICANT: Negative ESG sentiment is associated with lower abnormal returns")
-        else:
-            print("❌ NOT SIGNIFICANT: No clear relationship between ESG sentiment and abnormal returns")
-        
-        # Momentum impact
-        momentum_coef = model.params['momentum']
-        momentum_pvalue = model.pvalues['momentum']
-        print(f"\nMomentum Impact: {momentum_coef:.6f}")
-        print(f"P-value: {momentum_pvalue:.6f}")
-        
-        # Model fit
-        print(f"\nR-squared: {model.rsquared:.4f}")
-        print(f"Adjusted R-squared: {model.rsquared_adj:.4f}")
-        
-        # Additional analysis by sentiment category
-        print("\n" + "="*60)
-        print("ANALYSIS BY SENTIMENT CATEGORY")
-        print("="*60)
-        
-        sentiment_analysis = df_clean.groupby('sentiment_category')['abnormal_return'].agg(['mean', 'std', 'count'])
-        print(sentiment_analysis)
-        
-        # Save results
-        results = {
-            'model_summary': str(model.summary()),
-            'sentiment_coef': sentiment_coef,
-            'sentiment_pvalue': sentiment_pvalue,
-            'r_squared': model.rsquared,
-            'n_observations': len(df_clean),
-            'model_type': 'without_vix'
+def _engine_results(data, n_boot=N_BOOTSTRAP, window=ROLLING_WINDOW):
+    """
+    Bootstrap CIs, per-ticker/per-sector coefficients and the rolling
+    sentiment coefficient path for the pooled model, all from data.X.
+    """
+    names = list(data.X.columns)
+    # Rolling windows need time order; the design matrix itself is reused as-is
+    order = data.df.sort_values(["event_date", "ticker", "window_day"], kind="stable").index
+    df = data.df.loc[order]
+    X, y = data.X.loc[order].to_numpy(), data.y.loc[order].to_numpy()
+    # Resample whole event windows: the rows of one event share its sentiment
+    events = (df["ticker"].astype(str) + "|" + df["event_date"].astype(str)).to_numpy()
+    with timed("regression", "bootstrap"):
+        ci = percentile_ci(bootstrap_coefficients(X, y, n_boot, clusters=events))
+    logger.info("Bootstrap %.0f%% confidence intervals (%d event resamples):", 100 * CI_LEVEL, n_boot)
+    for name, (lo, hi) in zip(names, ci):
+        logger.info("  %s: [%.6f, %.6f]", name, lo, hi)
+
+    with timed("regression", "grouped_fits"):
+        groups = {
+            col: grouped_fits(X, y, df[col].astype(str).to_numpy(), names, n_boot=n_boot, clusters=events)
+            for col in ("ticker", "sector") if col in df.columns
         }
-        
-        return model, results
-    
-    # Create sentiment categories for analysis
-    df_clean['sentiment_category'] = pd.cut(df_clean['sentiment_score'], 
-                                          bins=[-np.inf, 0.3, 0.7, np.inf], 
-                                          labels=['Negative', 'Neutral', 'Positive'])
-    
-    # Prepare features and target
-    X = df_clean[["sentiment_score", "vix", "momentum"]]
-    y = df_clean["abnormal_return"]
-    
-    # Add constant for intercept
-    X = sm.add_constant(X)
-    
-    print("\nRunning regression analysis...")
-    print("Model: abnormal_return ~ sentiment_score + vix + momentum")
-    
-    # Fit the model
-    model = sm.OLS(y, X).fit()
-    
-    # Print results
-    print("\n" + "="*60)
-    print("REGRESSION RESULTS")
-    print("="*60)
-    print(model.summary())
-    
-    # Interpret key results
-    print("\n" + "="*60)
-    print("KEY FINDINGS")
-    print("="*60)
-    
+    with timed("regression", "rolling_fit"):
+        rolling = rolling_coefficients(X, y, window)
+    sentiment_idx = names.index("sentiment_score")
+    return {
+        "bootstrap_ci": {name: bounds.tolist() for name, bounds in zip(names, ci)},
+        "n_bootstrap": n_boot,
+        "group_coefficients": groups,
+        "rolling_window": window,
+        "rolling_sentiment_coef": [
+            {"event_date": d, "coef": c}
+            for d, c in zip(df["event_date"].iloc[window - 1:].tolist(), rolling[:, sentiment_idx].tolist())
+        ],
+    }
+
+def _fit_regression(data, n_boot=N_BOOTSTRAP):
+    if len(data) == 0:
+        logger.error("No data left after dropping missing values! "
+                     "All rows have at least one missing value in the required columns.")
+        return None, None
+
+    # Sample rows are only formatted when debug logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Sample of data (first 5 rows):\n%s", data.df[[data.target] + data.factors].head())
+
+    logger.info("Running regression analysis: %s", data.formula)
+    model = data.fit()
+    count("items", len(data), stage="regression", item="observations")
+    summary = str(model.summary())
+
+    rule = "=" * 60
+    logger.info("\n%s\nREGRESSION RESULTS\n%s\n%s", rule, rule, summary)
+    logger.info("\n%s\nKEY FINDINGS\n%s", rule, rule)
+
     # Sentiment impact
     sentiment_coef = model.params['sentiment_score']
     sentiment_pvalue = model.pvalues['sentiment_score']
-    print(f"Sentiment Impact: {sentiment_coef:.6f}")
-    print(f"P-value: {sentiment_pvalue:.6f}")
-    
+    logger.info("Sentiment Impact: %.6f", sentiment_coef)
+    logger.info("P-value: %.6f", sentiment_pvalue)
+
     if sentiment_pvalue < 0.05:
         if sentiment_coef > 0:
-            print("✅ SIGNIFICANT: Positive ESG sentiment is associated with higher abnormal returns")
+            logger.info("✅ SIGNIFICANT: Positive ESG sentiment is associated with higher abnormal returns")
         else:
-            print("✅ SIGNIFICANT: Negative ESG sentiment is associated with lower abnormal returns")
+            logger.info("✅ SIGNIFICANT: Negative ESG sentiment is associated with lower abnormal returns")
     else:
-        print("❌ NOT SIGNIFICANT: No clear relationship between ESG sentiment and abnormal returns")
-    
-    # VIX impact
-    vix_coef = model.params['vix']
-    vix_pvalue = model.pvalues['vix']
-    print(f"\nVIX Impact: {vix_coef:.6f}")
-    print(f"P-value: {vix_pvalue:.6f}")
-    
-    # Momentum impact
-    momentum_coef = model.params['momentum']
-    momentum_pvalue = model.pvalues['momentum']
-    print(f"\nMomentum Impact: {momentum_coef:.6f}")
-    print(f"P-value: {momentum_pvalue:.6f}")
-    
+        logger.info("❌ NOT SIGNIFICANT: No clear relationship between ESG sentiment and abnormal returns")
+
+    # Remaining factors
+    for factor in data.factors:
+        if factor == 'sentiment_score':
+            continue
+        logger.info("\n%s Impact: %.6f", factor, model.params[factor])
+        logger.info("P-value: %.6f", model.pvalues[factor])
+
     # Model fit
-    print(f"\nR-squared: {model.rsquared:.4f}")
-    print(f"Adjusted R-squared: {model.rsquared_adj:.4f}")
-    
+    logger.info("\nR-squared: %.4f", model.rsquared)
+    logger.info("Adjusted R-squared: %.4f", model.rsquared_adj)
+
     # Additional analysis by sentiment category
-    print("\n" + "="*60)
-    print("ANALYSIS BY SENTIMENT CATEGORY")
-    print("="*60)
-    
-    sentiment_analysis = df_clean.groupby('sentiment_category')['abnormal_return'].agg(['mean', 'std', 'count'])
-    print(sentiment_analysis)
-    
+    if logger.isEnabledFor(logging.INFO):
+        sentiment_analysis = data.df.groupby('sentiment_category', observed=False)['abnormal_return'].agg(['mean', 'std', 'count'])
+        logger.info("\n%s\nANALYSIS BY SENTIMENT CATEGORY\n%s\n%s", rule, rule, sentiment_analysis)
+
     # Save results
     results = {
-        'model_summary': str(model.summary()),
+        'model_summary': summary,
         'sentiment_coef': sentiment_coef,
         'sentiment_pvalue': sentiment_pvalue,
         'r_squared': model.rsquared,
-        'n_observations': len(df_clean)
+        'n_observations': len(data),
+        'factors': data.factors,
     }
-    
+    if 'vix' not in data.factors:
+        results['model_type'] = 'without_vix'
+    results.update(_engine_results(data, n_boot))
+
     return model, results
 
 def create_visualizations(df, model_results):
     """
     Create visualizations for the regression results
     """
+    import matplotlib.pyplot as plt
     try:
         # Sentiment vs Abnormal Returns scatter plot
         plt.figure(figsize=(12, 8))
@@ -239,14 +226,24 @@ def create_visualizations(df, model_results):
         print(f"Could not create visualizations: {e}")
 
 if __name__ == "__main__":
-    # Run the regression
-    model, results = run_regression()
-    
+    parser = argparse.ArgumentParser(description="Multi-factor regression of abnormal returns on ESG sentiment")
+    parser.add_argument("--input", default="data/market_features.parquet")
+    parser.add_argument("--esg-factors", action="store_true", help="add E/S/G keyword hit counts as factors")
+    parser.add_argument("--market-factors", action="store_true", help="add VIX change and rolling market volatility as factors")
+    parser.add_argument("--sectors", default=SECTOR_MAP_PATH, help="ticker,sector CSV for the per-sector fits")
+    parser.add_argument("--log-level", default=None, help="DEBUG adds missing-value counts and sample rows")
+    args = parser.parse_args()
+    configure_logging(args.log_level or LOG_LEVEL)
+    factor_model = FactorModel(DEFAULT_FACTORS + (ESG_FACTORS if args.esg_factors else [])
+                               + (MARKET_FACTORS if args.market_factors else []))
+
+    # Load and clean once; the fit and the plots share the same frame
+    data = load_factor_data(args.input, factor_model, sector_map_path=args.sectors)
+    model, results = run_regression(args.input, data=data, factor_model=factor_model)
+
     # Create visualizations
-    df = pd.read_csv("data/market_features.csv")
-    df['sentiment_score'] = pd.to_numeric(df['sentiment_score'], errors='coerce')
-    df_clean = df.dropna(subset=["abnormal_return", "sentiment_score", "vix", "momentum"])
-    create_visualizations(df_clean, results)
+    if results:
+        create_visualizations(data.df, results)
     
     print("\n" + "="*60)
     print("ANALYSIS COMPLETE!")
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_CACHE_PATH = "data/sentiment_cache.sqlite"
+DEFAULT_MAX_ENTRIES = 200_000
+
+
+def normalize_text(text):
+    # NFKC + collapsed whitespace; the tokenizer treats these variants identically
+    return " ".join(unicodedata.normalize("NFKC", str(text)).split())
+
+
+def cache_key(text, model_id, revision):
+    payload = f"{model_id}\x00{revision}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """
+    Persistent (label, score) cache keyed by normalized text and model id/revision.
+    Entries are evicted least-recently-used once the cache exceeds max_entries.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, model_id="", revision="", max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.model_id = model_id
+        self.revision = revision
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Backfill workers share the file across processes; wait out their write locks
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment ("
+            "key TEXT PRIMARY KEY, label TEXT NOT NULL, score REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sentiment_last_used ON sentiment (last_used)")
+        self._conn.commit()
+
+    def _key(self, text):
+        return cache_key(text, self.model_id, self.revision)
+
+    def get_many(self, texts):
+        """Return {index: (label, score)} for the texts already in the cache."""
+        keys = [self._key(t) for t in texts]
+        found = {}
+        with self._lock:
+            unique = list(set(keys))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, label, score FROM sentiment WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update({key: (label, score) for key, label, score in rows})
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE sentiment SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+        return {i: found[k] for i, k in enumerate(keys) if k in found}
+
+    def put_many(self, texts, results):
+        now = time.time()
+        rows = [(self._key(t), label, float(score), now) for t, (label, score) in zip(texts, results)]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM sentiment WHERE key IN (SELECT key FROM sentiment ORDER BY last_used LIMIT ?)", (excess,)
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
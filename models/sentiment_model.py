@@ -1,16 +1,172 @@
-from transformers import pipeline
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import threading
 import pandas as pd
+from models.backends import load_sentiment_pipeline, FINBERT_MODEL, FINBERT_REVISION
+from models.sentiment_cache import SentimentCache, DEFAULT_CACHE_PATH, normalize_text
+from src.artifacts import read_artifact, write_artifact, artifact_exists
+from src.esg_matcher import default_matcher
+from src.dedup import DEDUP_COLUMNS
+from src.checkpoints import manifest_for, article_ids, article_content_hashes, upsert_rows
+from src.metrics import get_logger, timed, count
+
+logger = get_logger("sentiment")
+
+# One of models.backends.BACKENDS: pytorch (fp32), int8 or onnx
+SENTIMENT_BACKEND = os.environ.get("SENTIMENT_BACKEND", "pytorch")
+
+# Titles per forward pass; sorted by length so each batch pads to similar sizes
+SENTIMENT_BATCH_SIZE = 32
+ON_SCORED_CHUNK_ROWS = 256
+
+# FinBERT pipeline and cache are created on first use, not at import
+_sentiment_pipeline = None
+_sentiment_cache = None
+_init_lock = threading.Lock()
+
+def get_sentiment_pipeline():
+    global _sentiment_pipeline
+    if _sentiment_pipeline is None:
+        with _init_lock:
+            if _sentiment_pipeline is None:
+                _sentiment_pipeline = load_sentiment_pipeline(SENTIMENT_BACKEND)
+    return _sentiment_pipeline
+
+def set_sentiment_pipeline(pipe):
+    """Swap in a different pipeline (e.g. a stand-in model for benchmarks)."""
+    global _sentiment_pipeline
+    with _init_lock:
+        _sentiment_pipeline = pipe
+
+def set_sentiment_cache(cache):
+    """Swap in a different SentimentCache (e.g. a throwaway file per benchmark run)."""
+    global _sentiment_cache
+    with _init_lock:
+        _sentiment_cache = cache
+
+def get_sentiment_cache():
+    # Shared by the batch scorer and the /sentiment-score endpoint
+    global _sentiment_cache
+    if _sentiment_cache is None:
+        with _init_lock:
+            if _sentiment_cache is None:
+                _sentiment_cache = SentimentCache(
+                    os.environ.get("SENTIMENT_CACHE_PATH", DEFAULT_CACHE_PATH),
+                    model_id=FINBERT_MODEL,
+                    # Backends can differ slightly in score, so they do not share entries
+                    revision=f"{FINBERT_REVISION}/{SENTIMENT_BACKEND}",
+                )
+    return _sentiment_cache
+
+def warm_up():
+    """Load the model and run one tiny batch so the first real request is fast."""
+    get_sentiment_cache()
+    get_sentiment_pipeline()(["warm-up"], truncation=True)
+
+def _run_model(texts, batch_size):
+    sentiment_pipeline = get_sentiment_pipeline()
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    results = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start:start + batch_size]
+        with timed("score", "inference_batch"):
+            outputs = sentiment_pipeline([texts[i] for i in batch_idx], batch_size=batch_size, truncation=True)
+        for i, out in zip(batch_idx, outputs):
+            results[i] = (out["label"], float(out["score"]))
+    return results
+
+def score_texts(texts, batch_size=SENTIMENT_BATCH_SIZE, use_cache=True):
+    """
+    Score texts in length-sorted micro-batches, one forward pass per text.
+    Cached and repeated texts are not sent to the model again.
+    Returns a list of (label, score) tuples in the input order.
+    """
+    texts = ["" if pd.isna(t) else str(t) for t in texts]
+    results = [None] * len(texts)
+    if use_cache:
+        hits = get_sentiment_cache().get_many(texts)
+        for i, hit in hits.items():
+            results[i] = hit
+        count("sentiment_cache_lookups", len(hits), result="hit")
+        count("sentiment_cache_lookups", len(texts) - len(hits), result="miss")
+    # Syndicated headlines repeat within a run, so score each normalized text once
+    pending = {}
+    for i, text in enumerate(texts):
+        if results[i] is None:
+            pending.setdefault(normalize_text(text), []).append(i)
+    if pending:
+        unique_texts = [texts[idx[0]] for idx in pending.values()]
+        scored = _run_model(unique_texts, batch_size)
+        count("items", len(unique_texts), stage="score", item="model_texts")
+        for idx, result in zip(pending.values(), scored):
+            for i in idx:
+                results[i] = result
+        if use_cache:
+            get_sentiment_cache().put_many(unique_texts, scored)
+    return results
 
-# Load FinBERT sentiment pipeline
-sentiment_pipeline = pipeline("sentiment-analysis", model="ProsusAI/finbert")
+def _refresh_dedup_columns(existing, news_df, ids):
+    # Re-deduplication can add tickers or copies to an article whose text is
+    # unchanged; take those columns from the news artifact without re-scoring
+    columns = [c for c in DEDUP_COLUMNS if c in news_df.columns and c in existing.columns]
+    if not columns:
+        return existing
+    existing = existing.copy()
+    existing_ids = article_ids(existing)
+    for col in columns:
+        current = pd.Series(news_df[col].to_numpy(), index=ids.to_numpy())
+        current = current[~current.index.duplicated(keep="last")]
+        existing[col] = existing_ids.map(current).fillna(existing[col]).astype(existing[col].dtype)
+    return existing
 
-def score_news_sentiment(input_csv="data/sample_news.csv", output_csv="data/sample_news_scored.csv"):
-    df = pd.read_csv(input_csv)
-    # Score each headline (title)
-    df["sentiment_label"] = df["title"].apply(lambda x: sentiment_pipeline(x)[0]["label"])
-    df["sentiment_score"] = df["title"].apply(lambda x: sentiment_pipeline(x)[0]["score"])
-    df.to_csv(output_csv, index=False)
-    print(f"Saved sentiment-scored news to {output_csv}")
+@timed("score")
+def score_news_sentiment(input_path="data/sample_news.parquet", output_path="data/sample_news_scored.parquet",
+                         batch_size=SENTIMENT_BATCH_SIZE, incremental=False, export_csv=False, on_scored=None):
+    """
+    Score every headline in input_path and write the scored artifact.
+    on_scored(rows) is called with each newly scored chunk as soon as it is
+    ready (e.g. a StreamingAlertEvaluator), before the artifact is written.
+    """
+    df = read_artifact(input_path, "news")
+    if "esg_categories" not in df.columns:
+        # Older news files predate ESG tagging; tag them here so features can use it
+        df = default_matcher.tag_frame(df).drop(columns="esg_relevant")
+    manifest = manifest_for("score", output_path)
+    ids, hashes = article_ids(df), article_content_hashes(df)
+    existing, current = None, set(ids)
+    if incremental and artifact_exists(output_path):
+        existing = _refresh_dedup_columns(read_artifact(output_path, "scored"), df, ids)
+        changed = manifest.changed(ids, hashes)
+        df, ids, hashes = df[changed], ids[changed], hashes[changed]
+        logger.info("Incremental run: %d new or changed headlines to score", int(changed.sum()))
+    else:
+        manifest.reset()
+    # Score each headline (title) once; label and score come from the same pass.
+    # With a listener, score in chunks so it sees results while the rest are scored
+    chunk_rows = ON_SCORED_CHUNK_ROWS if on_scored is not None else max(len(df), 1)
+    chunks = []
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].copy()
+        scored = score_texts(chunk["title"].tolist(), batch_size=batch_size)
+        chunk["sentiment_label"] = [label for label, _ in scored]
+        chunk["sentiment_score"] = [score for _, score in scored]
+        if on_scored is not None:
+            on_scored(chunk)
+        chunks.append(chunk)
+    df = pd.concat(chunks) if chunks else df.assign(sentiment_label=pd.Series(dtype="string"),
+                                                      sentiment_score=pd.Series(dtype="float64"))
+    count("items", len(df), stage="score", item="headlines")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Scored %d headlines (%d entries in sentiment cache)", len(df), len(get_sentiment_cache()))
+    df = upsert_rows(existing, df, article_ids, keep=current)
+    write_artifact(df, output_path, "scored", export_csv=export_csv)
+    manifest.update(ids, hashes)
+    manifest.save()
+    logger.info("Saved sentiment-scored news to %s", output_path)
 
 if __name__ == "__main__":
+    from src.metrics import configure_logging
+    configure_logging()
     score_news_sentiment()
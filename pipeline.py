@@ -1,144 +1,147 @@
+import os
 import pandas as pd
-import requests
-import time
-import yfinance as yf
-from datetime import datetime, timedelta
-import streamlit as st
-from models.sentiment_model import score_news_sentiment
+from models.sentiment_model import score_news_sentiment, score_texts
 from models.regression_model import run_regression
+from src.news_client import GNewsClient
+from src.ingestion import build_esg_query, filter_esg_articles
+from src.price_store import get_default_store
+from src.abnormal_return_calc import compute_event_features, EVENT_OFFSETS, ESG_TAG_COLUMNS
+from src.artifacts import NEWS_SCHEMA, read_artifact, write_artifact, artifact_exists, artifact_columns, apply_schema, ArtifactWriter
+from src.streaming import stream_features
+from src.dedup import deduplicate_news, explode_tickers
+from src.planner import PortfolioPlan
+from src.metrics import get_logger, configure_logging, timed, count, profiled, metrics, PROFILERS, LOG_LEVEL
+from src.checkpoints import (
+    manifest_for, article_ids, article_content_hashes, event_ids, event_row_counts, hash_columns, upsert_rows
+)
 
-# ESG News Ingestion
-ESG_KEYWORDS = [
-    "sustainability", "emissions", "diversity", "governance", "climate", "ESG",
-    "carbon", "renewable", "green", "social", "responsibility", "inclusion"
-]
-GNEWS_API_KEY = st.secrets["GNEWS_API_KEY"]  # Set this in Streamlit Cloud secrets
-GNEWS_ENDPOINT = "https://gnews.io/api/v4/search"
-SP500_TICKER = "^GSPC"
-VIX_TICKER = "^VIX"
+logger = get_logger("pipeline")
 
-def fetch_esg_news_for_portfolio():
-    df = pd.read_csv("data/user_portfolio.csv")
+
+def get_gnews_api_key():
+    # Environment first; Streamlit secrets only when running under Streamlit Cloud
+    if os.environ.get("GNEWS_API_KEY"):
+        return os.environ["GNEWS_API_KEY"]
+    import streamlit as st
+    return st.secrets["GNEWS_API_KEY"]  # Set this in Streamlit Cloud secrets
+
+@timed("ingest")
+def fetch_esg_news_for_portfolio(portfolio_csv="data/user_portfolio.csv", output_path="data/sample_news.parquet", client=None, incremental=False):
+    df = pd.read_csv(portfolio_csv)
+    tickers = list(dict.fromkeys(df["ticker"]))
+    # Tickers are fetched concurrently under the client's shared rate limit
+    client = client or GNewsClient(get_gnews_api_key())
+    results = client.search_many({t: build_esg_query(t) for t in tickers})
     all_news = []
-    for ticker in df["ticker"]:
-        query = f"{ticker} (" + " OR ".join(ESG_KEYWORDS) + ")"
-        params = {
-            "q": query,
-            "token": GNEWS_API_KEY,
-            "lang": "en",
-            "max": 10,
-            "sort_by": "publishedAt"
-        }
-        response = requests.get(GNEWS_ENDPOINT, params=params)
-        if response.status_code != 200:
-            continue
-        articles = response.json().get("articles", [])
-        for a in articles:
-            text = (a.get("title", "") + " " + a.get("description", "")).lower()
-            if any(kw.lower() in text for kw in ESG_KEYWORDS):
-                all_news.append({
-                    "ticker": ticker,
-                    "title": a.get("title", ""),
-                    "description": a.get("description", ""),
-                    "publishedAt": a.get("publishedAt", ""),
-                    "url": a.get("url", "")
-                })
-        time.sleep(1)
-    news_df = pd.DataFrame(all_news)
-    news_df.to_csv("data/sample_news.csv", index=False)
+    for ticker, articles in results.items():
+        all_news.extend(filter_esg_articles(ticker, articles))
+    count("items", len(all_news), stage="ingest", item="esg_articles")
+    news_df = pd.DataFrame(all_news, columns=list(NEWS_SCHEMA))
+    news_df = apply_schema(news_df, "news")
+    manifest = manifest_for("ingest", output_path)
+    ids, hashes = article_ids(news_df), article_content_hashes(news_df)
+    if incremental and artifact_exists(output_path):
+        # Keep earlier articles for the current tickers and append only unseen ones
+        existing = read_artifact(output_path, "news", tickers=tickers)
+        changed = manifest.changed(ids, hashes)
+        news_df = upsert_rows(existing, news_df[changed], article_ids)
+        logger.info("Incremental run: %d new or changed articles", int(changed.sum()))
+    else:
+        manifest.reset()
+    # Score syndicated copies once; the canonical article keeps every ticker
+    with timed("ingest", "dedup"):
+        news_df, dedup_ratio = deduplicate_news(news_df)
+    logger.info("Deduplicated news: %d unique articles (%.1f%% near-duplicates removed)", len(news_df), 100 * dedup_ratio)
+    write_artifact(news_df, output_path, "news")
+    manifest.update(ids, hashes)
+    manifest.save()
 
-def get_price_data(ticker, start_date, end_date):
-    return yf.download(ticker, start=start_date, end=end_date, progress=False)
+def get_price_data(ticker, start_date, end_date, store=None):
+    return (store or get_default_store()).window(ticker, start_date, end_date)
 
-def calculate_market_features(news_csv="data/sample_news_scored.csv", output_csv="data/market_features.csv"):
-    news_df = pd.read_csv(news_csv)
-    features = []
-    def extract_scalar(value):
-        if hasattr(value, 'iloc'):
-            if len(value) > 0:
-                val = value.iloc[0]
-                return float(val) if not pd.isna(val) else None
-            else:
-                return None
-        elif hasattr(value, 'item'):
-            try:
-                val = value.item()
-                return float(val) if not pd.isna(val) else None
-            except:
-                return None
-        else:
-            try:
-                if pd.isna(value):
-                    return None
-                return float(value)
-            except:
-                return None
-    for idx, row in news_df.iterrows():
-        ticker = row["ticker"]
-        event_date = row["publishedAt"][:10]
-        try:
-            event_dt = datetime.strptime(event_date, "%Y-%m-%d")
-            if event_dt > datetime.now():
-                continue
-        except Exception:
-            continue
-        estimation_start = (event_dt - timedelta(days=80)).strftime("%Y-%m-%d")
-        estimation_end = (event_dt - timedelta(days=6)).strftime("%Y-%m-%d")
-        event_window_start = (event_dt - timedelta(days=5)).strftime("%Y-%m-%d")
-        event_window_end = (event_dt + timedelta(days=5)).strftime("%Y-%m-%d")
-        try:
-            stock_prices = get_price_data(ticker, estimation_start, event_window_end)
-            sp500_prices = get_price_data(SP500_TICKER, estimation_start, event_window_end)
-            vix_prices = get_price_data(VIX_TICKER, event_window_start, event_window_end)
-        except Exception:
-            continue
-        close_col = "Close" if "Close" in stock_prices.columns else ("Close", ticker)
-        sp500_close_col = "Close" if "Close" in sp500_prices.columns else ("Close", SP500_TICKER)
-        stock_returns = stock_prices[close_col].pct_change().dropna()
-        sp500_returns = sp500_prices[sp500_close_col].pct_change().dropna()
-        est_stock = stock_returns.loc[estimation_start:estimation_end]
-        est_sp500 = sp500_returns.loc[estimation_start:estimation_end]
-        if len(est_stock) < 10 or len(est_sp500) < 10:
-            continue
-        import statsmodels.api as sm
-        X = sm.add_constant(est_sp500.values)
-        y = est_stock.values
-        model = sm.OLS(y, X).fit()
-        alpha, beta = model.params
-        for offset in range(-3, 4):
-            day = (event_dt + timedelta(days=offset)).strftime("%Y-%m-%d")
-            if day not in stock_returns.index or day not in sp500_returns.index:
-                continue
-            actual_return = stock_returns.loc[day]
-            expected_return = alpha + beta * sp500_returns.loc[day]
-            actual_scalar = extract_scalar(actual_return)
-            expected_scalar = extract_scalar(expected_return)
-            abnormal_return = actual_scalar - expected_scalar if actual_scalar is not None and expected_scalar is not None else None
-            try:
-                momentum = (stock_prices.loc[day, close_col] / stock_prices.loc[day - 1, close_col]) - 1
-            except Exception:
-                momentum = None
-            # Initialize momentum_val safely
-            momentum_val = None
-            if isinstance(momentum, pd.Series):
-                if len(momentum) == 1:
-                    momentum_val = float(momentum.item())
-            elif pd.notna(momentum):
-                momentum_val = float(momentum)
-           
+@timed("features")
+def calculate_market_features(news_path="data/sample_news_scored.parquet", output_path="data/market_features.parquet", store=None, incremental=False, export_csv=False):
+    available = artifact_columns(news_path)
+    columns = ["ticker", "title", "publishedAt", "sentiment_label", "sentiment_score"]
+    extra = [c for c in ESG_TAG_COLUMNS + ["tickers"] if c in available]
+    news_df = explode_tickers(read_artifact(news_path, "scored", columns=columns + extra))
+    manifest = manifest_for("features", output_path)
+    ids = event_ids(news_df)
+    hashes = hash_columns(news_df, ["sentiment_label", "sentiment_score"])
+    existing, current = None, set(ids)
+    if incremental and artifact_exists(output_path):
+        existing = read_artifact(output_path, "features")
+        changed = manifest.changed(ids, hashes)
+        news_df, ids, hashes = news_df[changed], ids[changed], hashes[changed]
+        logger.info("Incremental run: %d new or changed events", int(changed.sum()))
+    else:
+        manifest.reset()
+    features_df = compute_event_features(news_df, store or get_default_store())
+    count("items", len(news_df), stage="features", item="events")
+    count("items", len(features_df), stage="features", item="feature_rows")
+    # Events whose window is not complete yet are retried on the next run
+    complete = event_row_counts(news_df, features_df) >= len(EVENT_OFFSETS)
+    features_df = upsert_rows(existing, features_df, event_ids, keep=current)
+    write_artifact(features_df, output_path, "features", export_csv=export_csv)
+    manifest.update(ids[complete], hashes[complete])
+    manifest.save()
 
-            features.append({
-                "ticker": ticker,
-                "event_date": event_date,
-                "window_day": offset,
-                "actual_return": actual_scalar,
-                "expected_return": expected_scalar,
-                "abnormal_return": abnormal_return,
-                "momentum": momentum_val,
-                "sentiment_label": row["sentiment_label"],
-                "sentiment_score": float(row["sentiment_score"]) if not pd.isna(row["sentiment_score"]) else None,
-                "title": row["title"]
-            })
+def run_pipeline(portfolio_csv="data/user_portfolio.csv", data_dir="data", incremental=True, export_csv=False,
+                 on_scored=None):
+    """
+    Run ingest -> score -> features -> regression. In incremental mode each
+    stage only processes rows its manifest has not seen, so a re-run on an
+    unchanged day skips the model and the event study entirely. on_scored
+    receives newly scored headlines as they land (e.g. for live alerts).
+    """
+    logger.info(PortfolioPlan(pd.read_csv(portfolio_csv)["ticker"].astype(str)).describe())
+    news_path = os.path.join(data_dir, "sample_news.parquet")
+    scored_path = os.path.join(data_dir, "sample_news_scored.parquet")
+    features_path = os.path.join(data_dir, "market_features.parquet")
+    fetch_esg_news_for_portfolio(portfolio_csv, news_path, incremental=incremental)
+    score_news_sentiment(news_path, scored_path, incremental=incremental, export_csv=export_csv, on_scored=on_scored)
+    calculate_market_features(scored_path, features_path, incremental=incremental, export_csv=export_csv)
+    return run_regression(features_path, incremental=incremental)
 
-    features_df = pd.DataFrame(features)
-    features_df.to_csv(output_csv, index=False) 
\ No newline at end of file
+def run_streaming_pipeline(portfolio_csv="data/user_portfolio.csv", output_path="data/market_features.parquet",
+                           client=None, store=None):
+    """
+    Streaming mode: articles flow fetch -> filter -> score -> features through
+    bounded queues, and feature rows are appended to output_path as each
+    micro-batch completes instead of after the whole portfolio is fetched.
+    """
+    tickers = list(dict.fromkeys(pd.read_csv(portfolio_csv)["ticker"]))
+    client = client or GNewsClient(get_gnews_api_key())
+    with ArtifactWriter(output_path, "features") as writer:
+        for features_df in stream_features(tickers, client, build_esg_query, filter_esg_articles,
+                                           score_texts, store or get_default_store()):
+            writer.write(features_df)
+            logger.info("Streamed %d feature rows (%d total)", len(features_df), writer.rows)
+    return run_regression(output_path)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the ESG sentiment pipeline")
+    parser.add_argument("--full", action="store_true", help="reprocess everything instead of only new rows")
+    parser.add_argument("--export-csv", action="store_true", help="also write CSV copies of the scored news and features")
+    parser.add_argument("--stream", action="store_true", help="stream articles through all stages with bounded queues")
+    parser.add_argument("--alerts", action="store_true", help="print streaming alerts as headlines are scored")
+    parser.add_argument("--log-level", default=None, help="DEBUG, INFO (default, or $LOG_LEVEL) or WARNING")
+    parser.add_argument("--profile", choices=PROFILERS, help="profile this run with cProfile or a sampling profiler")
+    parser.add_argument("--profile-output", help="where to write the profile (pipeline.prof / pipeline_profile.html)")
+    parser.add_argument("--metrics-output", help="write per-stage timers and counters for this run as JSON")
+    args = parser.parse_args()
+    configure_logging(args.log_level or LOG_LEVEL)
+    with profiled(args.profile, args.profile_output):
+        if args.stream:
+            run_streaming_pipeline()
+        else:
+            on_scored = None
+            if args.alerts:
+                from src.alert_engine import StreamingAlertEvaluator
+                on_scored = StreamingAlertEvaluator(on_alert=lambda alerts: print(alerts[["publishedAt", "ticker", "rule", "alert"]].to_string(index=False)))
+            run_pipeline(incremental=not args.full, export_csv=args.export_csv, on_scored=on_scored)
+    if args.metrics_output:
+        import json
+        with open(args.metrics_output, "w") as f:
+            json.dump(metrics.snapshot(), f, indent=2)
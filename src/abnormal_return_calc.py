@@ -1 +1,155 @@
-# Placeholder for abnormal_return_calc.py
+import numpy as np
+import pandas as pd
+from src.metrics import timed
+from src.market_factors import market_factors, SP500_TICKER, VIX_TICKER
+
+# Market model windows, in trading days relative to the event date
+ESTIMATION_WINDOW = (-80, -6)
+EVENT_OFFSETS = np.arange(-3, 4)  # T-3 to T+3
+MIN_ESTIMATION_OBS = 10
+# Calendar-day margins wide enough to cover the trading-day windows above
+PRICE_LOOKBACK_DAYS = 130
+PRICE_LOOKAHEAD_DAYS = 10
+MOMENTUM_LAG = 5  # % change over the 5 trading days before each window day, excluding that day's return
+
+ESG_TAG_COLUMNS = ["esg_categories", "e_hits", "s_hits", "g_hits"]
+# Market factors (src/market_factors.py) copied onto each event-window day besides vix
+MARKET_FACTOR_COLUMNS = ["vix_change", "market_vol"]
+
+FEATURE_COLUMNS = [
+    "ticker", "event_date", "window_day", "actual_return", "expected_return", "abnormal_return",
+    "momentum", "vix", *MARKET_FACTOR_COLUMNS, "sentiment_label", "sentiment_score", "title"
+]
+
+
+def parse_events(news_df):
+    """Event dates (normalized Timestamps) for each news row; NaT for unparseable or future dates."""
+    dates = pd.to_datetime(news_df["publishedAt"].astype(str).str[:10], format="%Y-%m-%d", errors="coerce")
+    return dates.where(dates <= pd.Timestamp.now())
+
+
+def warm_event_windows(news_df, store):
+    # One fetch per symbol over the union of all its event windows
+    event_dates = parse_events(news_df)
+    valid = event_dates.notna()
+    if not valid.any():
+        return
+    starts = event_dates[valid] - pd.Timedelta(days=PRICE_LOOKBACK_DAYS)
+    ends = event_dates[valid] + pd.Timedelta(days=PRICE_LOOKAHEAD_DAYS)
+    ranges = list(zip(news_df.loc[valid, "ticker"].astype(str), starts, ends))
+    ranges += [(SP500_TICKER, starts.min(), ends.max()), (VIX_TICKER, starts.min(), ends.max())]
+    store.warm(ranges)
+
+
+def load_close_matrix(store, symbols, dates):
+    """Close prices of symbols aligned on the given trading days, as a dates x symbols array."""
+    closes = np.full((len(dates), len(symbols)), np.nan)
+    for j, symbol in enumerate(symbols):
+        closes[:, j] = store.get(symbol)["Close"].reindex(dates).to_numpy(dtype="float64")
+    return closes
+
+
+def simple_returns(closes):
+    returns = np.full(closes.shape, np.nan)
+    returns[1:] = closes[1:] / closes[:-1] - 1
+    return returns
+
+
+def market_model_params(stock_returns, market_returns, symbol_idx, lo, hi):
+    """
+    Closed-form OLS of stock on market returns for every event at once.
+    Rows lo..hi-1 of each event's symbol column form its estimation window;
+    sums over the window come from prefix sums, so each event costs O(1).
+    Returns (alpha, beta, n_obs) arrays.
+    """
+    valid = np.isfinite(stock_returns) & np.isfinite(market_returns)[:, None]
+    x = np.where(valid, market_returns[:, None], 0.0)
+    y = np.where(valid, stock_returns, 0.0)
+
+    def prefix(a):
+        return np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+
+    def window_sum(cum):
+        return cum[hi, symbol_idx] - cum[lo, symbol_idx]
+
+    n = window_sum(prefix(valid.astype("float64")))
+    sx, sy = window_sum(prefix(x)), window_sum(prefix(y))
+    sxx, sxy = window_sum(prefix(x * x)), window_sum(prefix(x * y))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        alpha = (sy - beta * sx) / n
+    return alpha, beta, n
+
+
+def compute_event_features(news_df, store):
+    """
+    Abnormal returns over T-3..T+3 for every news event, computed against one
+    shared returns matrix instead of per-event downloads and regressions.
+    Market returns, VIX and the other market factors come from
+    src.market_factors, loaded once per store and date range.
+    """
+    event_dates = parse_events(news_df)
+    ok = event_dates.notna().to_numpy()
+    if not ok.any():
+        return pd.DataFrame(columns=FEATURE_COLUMNS)
+    news = news_df.loc[ok].reset_index(drop=True)
+    event_dates = pd.DatetimeIndex(event_dates[ok])
+    tickers = news["ticker"].astype(str).to_numpy()
+
+    with timed("features", "price_warm"):
+        warm_event_windows(news, store)
+    symbols = list(dict.fromkeys(tickers))
+    start = event_dates.min() - pd.Timedelta(days=PRICE_LOOKBACK_DAYS)
+    end = event_dates.max() + pd.Timedelta(days=PRICE_LOOKAHEAD_DAYS)
+    # Benchmark series and their derived factors come precomputed from the shared per-store cache
+    factors = market_factors(store, start, end)
+    if len(factors) == 0:
+        return pd.DataFrame(columns=FEATURE_COLUMNS)
+    with timed("features", "close_matrix"):
+        closes = load_close_matrix(store, symbols, factors.dates)
+    stock_returns = simple_returns(closes)
+    market_returns = factors["market_return"]
+
+    symbol_idx = pd.Index(symbols).get_indexer(tickers)
+    calendar = factors.calendar
+    event_pos = calendar.positions(event_dates)
+    lo, hi, _ = calendar.window(event_pos, *ESTIMATION_WINDOW)
+    # A truncated estimation window is fine as long as MIN_ESTIMATION_OBS holds
+    lo, hi = np.clip(lo, 0, len(calendar)), np.clip(hi, 0, len(calendar))
+    with timed("features", "market_model_fit"):
+        alpha, beta, n_obs = market_model_params(stock_returns, market_returns, symbol_idx, lo, hi)
+
+    # Event panel: events x offsets as positional lookups on the calendar
+    pos, in_range = calendar.offsets(event_pos, EVENT_OFFSETS)
+    pos_c = np.clip(pos, 0, len(calendar) - 1)
+    cols = np.broadcast_to(symbol_idx[:, None], pos.shape)
+    actual = stock_returns[pos_c, cols]
+    market = market_returns[pos_c]
+    expected = alpha[:, None] + beta[:, None] * market
+    # Ends at the previous close: the day's own return is what abnormal_return is built from
+    prev = np.maximum(pos_c - 1, 0)
+    lagged = np.where(pos_c > MOMENTUM_LAG, closes[np.maximum(pos_c - 1 - MOMENTUM_LAG, 0), cols], np.nan)
+    momentum = np.where(pos_c >= 1, closes[prev, cols], np.nan) / lagged - 1
+    keep = (in_range & (n_obs >= MIN_ESTIMATION_OBS)[:, None]
+            & np.isfinite(actual) & np.isfinite(market))
+
+    rows, offs = np.nonzero(keep)
+    features_df = pd.DataFrame({
+        "ticker": tickers[rows],
+        "event_date": event_dates[rows].strftime("%Y-%m-%d"),
+        "window_day": EVENT_OFFSETS[offs],
+        "actual_return": actual[rows, offs],
+        "expected_return": expected[rows, offs],
+        "abnormal_return": actual[rows, offs] - expected[rows, offs],
+        "momentum": momentum[rows, offs],
+        "vix": factors["vix"][pos_c[rows, offs]],
+        **{name: factors[name][pos_c[rows, offs]] for name in MARKET_FACTOR_COLUMNS},
+        "sentiment_label": news["sentiment_label"].to_numpy()[rows],
+        "sentiment_score": news["sentiment_score"].to_numpy(dtype="float64")[rows],
+        "title": news["title"].to_numpy()[rows],
+    })
+    # ESG pillar tags ride along so the regression can use them as factors
+    for col in ESG_TAG_COLUMNS:
+        if col in news.columns:
+            features_df[col] = news[col].to_numpy()[rows]
+    return features_df
@@ -1 +1,367 @@
-# Placeholder for alert_engine.py
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MESSAGE = "⚠️ Negative ESG sentiment detected. Monitor closely."
+EWMA_ALPHA = 0.3
+NEGATIVE_WINDOW_HOURS = 24
+REPLAY_SECONDS = 10
+
+
+class AlertRule:
+    """
+    One alert condition over scored records. Every threshold left as None is
+    ignored; the rest must all hold for a record to fire:
+
+    - max_sentiment:        sentiment_score < max_sentiment
+    - sectors:              sector is one of sectors
+    - min_sentiment_drop:   the ticker's score fell by at least this much since its previous record
+    - max_abnormal_return:  abnormal_return < max_abnormal_return
+    - min_abnormal_return:  abnormal_return > min_abnormal_return
+    - max_sentiment_ewma:   sentiment_ewma < max_sentiment_ewma (streaming mode)
+    - min_negative_count:   negative_count >= min_negative_count (streaming mode)
+    - min_vix:              vix > min_vix
+    - min_market_vol:       market_vol > min_market_vol (rolling S&P 500 return volatility)
+
+    vix and market_vol come from the records or, when the engine has market
+    factors, from the trading day each record was published on.
+
+    A ticker that fired this rule is not alerted again until cooldown_minutes
+    have passed (by record timestamp).
+    """
+
+    def __init__(self, name, message=DEFAULT_MESSAGE, max_sentiment=None, sectors=None,
+                 min_sentiment_drop=None, max_abnormal_return=None, min_abnormal_return=None,
+                 max_sentiment_ewma=None, min_negative_count=None, min_vix=None, min_market_vol=None,
+                 cooldown_minutes=0):
+        self.name = name
+        self.message = message
+        self.max_sentiment = max_sentiment
+        self.sectors = list(sectors) if sectors is not None else None
+        self.min_sentiment_drop = min_sentiment_drop
+        self.max_abnormal_return = max_abnormal_return
+        self.min_abnormal_return = min_abnormal_return
+        self.max_sentiment_ewma = max_sentiment_ewma
+        self.min_negative_count = min_negative_count
+        self.min_vix = min_vix
+        self.min_market_vol = min_market_vol
+        self.cooldown = pd.Timedelta(minutes=cooldown_minutes)
+
+    @property
+    def market_columns(self):
+        """Market factor columns this rule reads."""
+        return [col for col, v in (("vix", self.min_vix), ("market_vol", self.min_market_vol)) if v is not None]
+
+    def compile(self):
+        """Return predicate(frame) -> boolean mask, built from only the thresholds that are set."""
+        checks = []
+        if self.max_sentiment is not None:
+            checks.append(lambda f, v=self.max_sentiment: _column(f, "sentiment_score") < v)
+        if self.sectors is not None:
+            checks.append(lambda f, v=self.sectors: f["sector"].isin(v).to_numpy() if "sector" in f else
+                          np.zeros(len(f), dtype=bool))
+        if self.min_sentiment_drop is not None:
+            checks.append(lambda f, v=self.min_sentiment_drop: -_column(f, "sentiment_change") >= v)
+        if self.max_abnormal_return is not None:
+            checks.append(lambda f, v=self.max_abnormal_return: _column(f, "abnormal_return") < v)
+        if self.min_abnormal_return is not None:
+            checks.append(lambda f, v=self.min_abnormal_return: _column(f, "abnormal_return") > v)
+        if self.max_sentiment_ewma is not None:
+            checks.append(lambda f, v=self.max_sentiment_ewma: _column(f, "sentiment_ewma") < v)
+        if self.min_negative_count is not None:
+            checks.append(lambda f, v=self.min_negative_count: _column(f, "negative_count") >= v)
+        if self.min_vix is not None:
+            checks.append(lambda f, v=self.min_vix: _column(f, "vix") > v)
+        if self.min_market_vol is not None:
+            checks.append(lambda f, v=self.min_market_vol: _column(f, "market_vol") > v)
+
+        def predicate(frame):
+            mask = np.ones(len(frame), dtype=bool)
+            for check in checks:
+                mask &= check(frame)
+            return mask
+        return predicate
+
+
+def _column(frame, name):
+    # Missing columns compare as NaN, so conditions on them never fire
+    if name not in frame:
+        return np.full(len(frame), np.nan)
+    return pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype="float64")
+
+
+# The rule /generate-alerts has always applied
+DEFAULT_RULES = [
+    AlertRule("negative_sentiment_sector", max_sentiment=-0.5, sectors=["energy", "consumer_goods"]),
+]
+
+
+class AlertEngine:
+    """
+    Evaluates compiled rules over whole batches of scored records. Per-ticker
+    state (last sentiment score, last alert time per rule) carries across
+    batches, so sentiment changes and cooldowns span calls. With
+    market_factors (a src.market_factors.MarketFactors), records without
+    the market columns a rule needs get them by publication date.
+    """
+
+    def __init__(self, rules=None, market_factors=None):
+        self.rules = list(rules or DEFAULT_RULES)
+        self.market_factors = market_factors
+        self._predicates = [rule.compile() for rule in self.rules]
+        self._needs_change = any(rule.min_sentiment_drop is not None for rule in self.rules)
+        self._market_columns = list(dict.fromkeys(col for rule in self.rules for col in rule.market_columns))
+        self._last_score = {}
+        self._last_alert = {}
+        self._lock = threading.Lock()
+
+    def evaluate(self, records, now=None):
+        """
+        Alerts for a batch of records (DataFrame or list of dicts), in record
+        order then rule order, as a DataFrame with record, ticker, rule, alert.
+        """
+        frame = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(records)
+        frame = frame.reset_index(drop=True)
+        empty = pd.DataFrame(columns=["record", "ticker", "rule", "alert"])
+        if len(frame) == 0 or "ticker" not in frame:
+            return empty
+        now = pd.Timestamp(now or pd.Timestamp.now(tz="UTC"))
+        times = (pd.to_datetime(frame["publishedAt"], utc=True, errors="coerce").fillna(now)
+                 if "publishedAt" in frame else pd.Series(now, index=frame.index))
+
+        if self.market_factors is not None:
+            missing = [col for col in self._market_columns if col not in frame]
+            if missing:
+                frame = frame.assign(**self.market_factors.asof(times, missing))
+
+        # Records may arrive out of publishedAt order; per-ticker history follows time order
+        order = np.argsort(times.to_numpy(), kind="stable")
+        with self._lock:
+            if self._needs_change:
+                frame = self._with_sentiment_change(frame, order)
+            fired = []
+            for rule_idx, (rule, predicate) in enumerate(zip(self.rules, self._predicates)):
+                hits = np.flatnonzero(predicate(frame))
+                if rule.cooldown > pd.Timedelta(0):
+                    hits = self._apply_cooldown(rule, hits, frame["ticker"], times)
+                fired.append(pd.DataFrame({"record": hits, "rule_idx": rule_idx}))
+            if "sentiment_score" in frame:
+                scores = pd.to_numeric(frame["sentiment_score"], errors="coerce").iloc[order]
+                last = scores.groupby(frame["ticker"].iloc[order]).last().dropna()
+                self._last_score.update(last.to_dict())
+
+        fired = pd.concat(fired, ignore_index=True).sort_values(["record", "rule_idx"], kind="stable")
+        if len(fired) == 0:
+            return empty
+        return pd.DataFrame({
+            "record": fired["record"].to_numpy(),
+            "ticker": frame["ticker"].to_numpy()[fired["record"]],
+            "rule": [self.rules[i].name for i in fired["rule_idx"]],
+            "alert": [self.rules[i].message for i in fired["rule_idx"]],
+        })
+
+    def _with_sentiment_change(self, frame, order):
+        # Previous score per ticker: the prior record in this batch, else the last batch's
+        scores = pd.to_numeric(frame["sentiment_score"], errors="coerce").iloc[order]
+        previous = scores.groupby(frame["ticker"].iloc[order]).shift(1)
+        carried = frame["ticker"].iloc[order].map(self._last_score)
+        change = scores - previous.fillna(carried)
+        return frame.assign(sentiment_change=change.sort_index())
+
+    def _apply_cooldown(self, rule, hits, tickers, times):
+        # Only records that already passed the vectorized predicate get here
+        if len(hits) == 0:
+            return hits
+        candidates = pd.DataFrame({"record": hits, "ticker": tickers.to_numpy()[hits], "time": times.to_numpy()[hits]})
+        kept = []
+        for row in candidates.sort_values("time", kind="stable").itertuples(index=False):
+            key = (rule.name, row.ticker)
+            last = self._last_alert.get(key)
+            if last is None or row.time - last >= rule.cooldown:
+                self._last_alert[key] = row.time
+                kept.append(row.record)
+        return np.sort(np.asarray(kept, dtype=int))
+
+    def reset(self):
+        with self._lock:
+            self._last_score.clear()
+            self._last_alert.clear()
+
+
+default_engine = AlertEngine()
+
+# Rules for the continuous mode, over the rolling per-ticker aggregates
+STREAMING_RULES = [
+    AlertRule("negative_sentiment_trend", "⚠️ Sustained negative ESG sentiment. Monitor closely.",
+              max_sentiment_ewma=-0.5, cooldown_minutes=240),
+    AlertRule("negative_headline_burst", "⚠️ Burst of negative ESG headlines. Monitor closely.",
+              min_negative_count=3, cooldown_minutes=60),
+]
+
+
+def signed_sentiment(labels, scores):
+    """FinBERT (label, confidence) as one signed score: negative < 0 < positive, neutral 0."""
+    labels = pd.Series(labels, dtype="string").str.lower().to_numpy()
+    scores = pd.to_numeric(pd.Series(scores), errors="coerce").to_numpy(dtype="float64")
+    return np.where(labels == "negative", -scores, np.where(labels == "positive", scores, 0.0))
+
+
+class TickerAggregate:
+    """
+    Rolling sentiment state for one ticker: an EWMA of signed sentiment and
+    negative-headline counts in a ring of hourly buckets. Memory and update
+    cost are fixed by window_hours, whatever the article rate.
+    """
+
+    __slots__ = ("ewma", "counts", "hours")
+
+    def __init__(self, window_hours):
+        self.ewma = None
+        self.counts = [0] * window_hours
+        self.hours = [-1] * window_hours
+
+    def update(self, hour, signed, negative, alpha):
+        self.ewma = signed if self.ewma is None else alpha * signed + (1 - alpha) * self.ewma
+        if negative:
+            slot = hour % len(self.hours)
+            if self.hours[slot] < hour:
+                self.hours[slot], self.counts[slot] = hour, 0
+            if self.hours[slot] == hour:
+                self.counts[slot] += 1
+
+    def negatives(self, hour):
+        window = len(self.hours)
+        return sum(c for c, h in zip(self.counts, self.hours) if hour - window < h <= hour)
+
+
+class StreamingAlertEvaluator:
+    """
+    Continuous alerting over scored articles as they arrive. Each call to
+    process() updates the per-ticker aggregates in timestamp order, adds
+    sentiment_ewma and negative_count to the rows and runs the compiled
+    rules over them, so alerts go out as soon as the batch is scored.
+    The evaluator is callable, so it can be passed as score_news_sentiment's
+    on_scored hook.
+    """
+
+    def __init__(self, rules=None, window_hours=NEGATIVE_WINDOW_HOURS, ewma_alpha=EWMA_ALPHA, on_alert=None,
+                 market_factors=None):
+        self.engine = AlertEngine(rules or STREAMING_RULES, market_factors)
+        self.window_hours = window_hours
+        self.ewma_alpha = ewma_alpha
+        self.on_alert = on_alert
+        self._state = {}
+        self.articles = 0
+        self.alerts = 0
+
+    def process(self, rows):
+        frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame.from_records(rows)
+        if len(frame) == 0:
+            return self.engine.evaluate(frame)
+        times = pd.to_datetime(frame["publishedAt"], utc=True, errors="coerce") if "publishedAt" in frame \
+            else pd.Series(pd.Timestamp.now(tz="UTC"), index=frame.index)
+        times = times.fillna(pd.Timestamp.now(tz="UTC"))
+        frame = frame.assign(publishedAt=times.dt.strftime("%Y-%m-%dT%H:%M:%SZ")).iloc[np.argsort(times.to_numpy(), kind="stable")]
+        hours = (frame["publishedAt"].pipe(pd.to_datetime, utc=True).astype("int64") // 3_600_000_000_000).to_numpy()
+        signed = signed_sentiment(frame.get("sentiment_label", pd.Series("", index=frame.index)), frame["sentiment_score"])
+        ewma = np.empty(len(frame))
+        negatives = np.empty(len(frame), dtype="int64")
+        for i, (ticker, hour, value) in enumerate(zip(frame["ticker"].tolist(), hours.tolist(), signed.tolist())):
+            state = self._state.get(ticker)
+            if state is None:
+                state = self._state[ticker] = TickerAggregate(self.window_hours)
+            state.update(hour, value, value < 0, self.ewma_alpha)
+            ewma[i], negatives[i] = state.ewma, state.negatives(hour)
+        frame = frame.assign(sentiment_ewma=ewma, negative_count=negatives).reset_index(drop=True)
+        alerts = self.engine.evaluate(frame)
+        self.articles += len(frame)
+        self.alerts += len(alerts)
+        if self.on_alert is not None and len(alerts):
+            self.on_alert(alerts.assign(
+                publishedAt=frame["publishedAt"].to_numpy()[alerts["record"].to_numpy(dtype=int)]))
+        return alerts
+
+    __call__ = process
+
+    def snapshot(self):
+        """Current per-ticker aggregates as {ticker: {"sentiment_ewma", "negative_count"}}."""
+        now_hour = int(pd.Timestamp.now(tz="UTC").value // 3_600_000_000_000)
+        return {t: {"sentiment_ewma": s.ewma, "negative_count": s.negatives(max(now_hour, max(s.hours)))}
+                for t, s in self._state.items()}
+
+
+def replay(input_path="data/sample_news_scored.csv", speed=None, duration=REPLAY_SECONDS, tick_ms=50,
+           repeat=1, quiet=False):
+    """
+    Feed historical scored news through a StreamingAlertEvaluator in
+    publishedAt order, speed times faster than real time (0 = as fast as
+    possible; None = compress the whole history into duration seconds).
+    Articles that came due during a tick are processed together.
+    Returns throughput and arrival-to-alert latency statistics.
+    """
+    from src.artifacts import read_artifact
+    df = read_artifact(input_path, "scored")
+    times = pd.to_datetime(df["publishedAt"], utc=True, errors="coerce")
+    df = df.assign(publishedAt=times).dropna(subset=["publishedAt"]).sort_values("publishedAt", kind="stable")
+    if repeat > 1:
+        # A larger universe over the same history: copy k trades as TICKER.k
+        df = pd.concat([df.assign(ticker=df["ticker"] + (f".{k}" if k else "")) for k in range(repeat)])
+        df = df.sort_values("publishedAt", kind="stable", ignore_index=True)
+    offsets = (df["publishedAt"] - df["publishedAt"].iloc[0]).dt.total_seconds().to_numpy()
+    if speed is None:
+        speed = offsets[-1] / duration if offsets[-1] > 0 else 0
+    due = offsets / speed if speed > 0 else np.zeros(len(df))
+    df = df.assign(publishedAt=df["publishedAt"].dt.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+    def show(alerts):
+        for row in alerts.itertuples(index=False):
+            print(f"[{row.publishedAt}] {row.ticker} {row.rule}: {row.alert}")
+
+    evaluator = StreamingAlertEvaluator(on_alert=None if quiet else show)
+    latencies = []
+    start = time.perf_counter()
+    pos = 0
+    while pos < len(df):
+        elapsed = time.perf_counter() - start
+        end = int(np.searchsorted(due, elapsed, side="right"))
+        if end == pos:
+            time.sleep(min(tick_ms / 1000.0, max(0.0, due[pos] - elapsed)))
+            continue
+        evaluator.process(df.iloc[pos:end])
+        done = time.perf_counter() - start
+        latencies.extend(done - due[pos:end])
+        pos = end
+    wall = time.perf_counter() - start
+    latencies = np.asarray(latencies)
+    return {
+        "articles": evaluator.articles,
+        "alerts": evaluator.alerts,
+        "tickers": len(evaluator._state),
+        "wall_seconds": wall,
+        "articles_per_second": evaluator.articles / max(wall, 1e-9),
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000) if len(latencies) else 0.0,
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1000) if len(latencies) else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay scored news through the streaming alert evaluator")
+    parser.add_argument("--input", default="data/sample_news_scored.csv")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="history seconds replayed per wall-clock second (0 = as fast as possible)")
+    parser.add_argument("--duration", type=float, default=REPLAY_SECONDS,
+                        help="without --speed, compress the whole history into this many seconds")
+    parser.add_argument("--tick-ms", type=float, default=50)
+    parser.add_argument("--repeat", type=int, default=1, help="replay this many copies of the universe at once")
+    parser.add_argument("--quiet", action="store_true", help="do not print individual alerts")
+    args = parser.parse_args()
+    stats = replay(args.input, args.speed, args.duration, args.tick_ms, args.repeat, args.quiet)
+    print(f"Replayed {stats['articles']} articles for {stats['tickers']} tickers in {stats['wall_seconds']:.2f}s: "
+          f"{stats['articles_per_second']:,.0f} articles/s, {stats['alerts']} alerts, "
+          f"latency p50 {stats['latency_p50_ms']:.1f} ms / p99 {stats['latency_p99_ms']:.1f} ms")
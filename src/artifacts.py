@@ -0,0 +1,182 @@
+import os
+
+import pandas as pd
+
+# Typed schemas for the artifacts each stage hands to the next
+NEWS_SCHEMA = {
+    "ticker": "string",
+    "title": "string",
+    "description": "string",
+    "publishedAt": "string",
+    "url": "string",
+    "esg_categories": "string",
+    "e_hits": "int64",
+    "s_hits": "int64",
+    "g_hits": "int64",
+    "tickers": "string",
+    "duplicate_count": "int64",
+}
+SCORED_SCHEMA = dict(NEWS_SCHEMA, sentiment_label="string", sentiment_score="float64")
+FEATURES_SCHEMA = {
+    "ticker": "string",
+    "event_date": "string",
+    "window_day": "int64",
+    "actual_return": "float64",
+    "expected_return": "float64",
+    "abnormal_return": "float64",
+    "momentum": "float64",
+    "vix": "float64",
+    "vix_change": "float64",
+    "market_vol": "float64",
+    "sentiment_label": "string",
+    "sentiment_score": "float64",
+    "title": "string",
+    "esg_categories": "string",
+    "e_hits": "int64",
+    "s_hits": "int64",
+    "g_hits": "int64",
+}
+SCHEMAS = {"news": NEWS_SCHEMA, "scored": SCORED_SCHEMA, "features": FEATURES_SCHEMA}
+# Column used for date-range filtering; ISO strings compare correctly as text
+DATE_COLUMNS = {"news": "publishedAt", "scored": "publishedAt", "features": "event_date"}
+ROW_GROUP_SIZE = 50_000
+
+
+def apply_schema(df, kind):
+    """Coerce columns to the artifact schema; only needed for data that came through CSV."""
+    schema = SCHEMAS[kind]
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == "float64":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        elif dtype == "int64":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64" if df[col].isna().any() else "int64")
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def resolve_artifact(path):
+    # The committed sample data is CSV; fall back to it until a Parquet copy exists
+    if path.endswith(".parquet") and not os.path.exists(path):
+        csv_path = path[:-len(".parquet")] + ".csv"
+        if os.path.exists(csv_path):
+            return csv_path
+    return path
+
+
+def artifact_exists(path):
+    return os.path.exists(resolve_artifact(path))
+
+
+def artifact_columns(path):
+    """Column names of an artifact, read from the Parquet schema or the CSV header."""
+    path = resolve_artifact(path)
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_artifact(path, kind, columns=None, tickers=None, start=None, end=None):
+    """
+    Read a stage artifact with optional column projection and ticker /
+    date-range filters (start inclusive, end exclusive, as YYYY-MM-DD).
+    Parquet reads push the filters down to skip whole row groups.
+    """
+    path = resolve_artifact(path)
+    date_col = DATE_COLUMNS[kind]
+    if path.endswith(".parquet"):
+        filters = []
+        if tickers is not None:
+            filters.append(("ticker", "in", list(tickers)))
+        if start is not None:
+            filters.append((date_col, ">=", str(start)))
+        if end is not None:
+            filters.append((date_col, "<", str(end)))
+        return pd.read_parquet(path, columns=columns, filters=filters or None)
+
+    usecols = None
+    if columns is not None:
+        usecols = list(columns)
+        if tickers is not None:
+            usecols.append("ticker")
+        if start is not None or end is not None:
+            usecols.append(date_col)
+        usecols = list(dict.fromkeys(usecols))
+    df = apply_schema(pd.read_csv(path, usecols=usecols), kind)
+    if tickers is not None:
+        df = df[df["ticker"].isin(list(tickers))]
+    if start is not None:
+        df = df[df[date_col] >= str(start)]
+    if end is not None:
+        df = df[df[date_col] < str(end)]
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
+
+
+def write_artifact(df, path, kind, export_csv=False):
+    """
+    Write a stage artifact in the format given by the path extension.
+    Parquet output is sorted by ticker and date so row groups prune well;
+    export_csv additionally writes a CSV copy next to it.
+    """
+    df = apply_schema(df, kind)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if path.endswith(".parquet"):
+        sort_cols = [c for c in ("ticker", DATE_COLUMNS[kind]) if c in df.columns]
+        if sort_cols:
+            df = df.sort_values(sort_cols, kind="stable").reset_index(drop=True)
+        tmp = path + ".tmp"
+        df.to_parquet(tmp, index=False, row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp, path)
+        if export_csv:
+            df.to_csv(path[:-len(".parquet")] + ".csv", index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+class ArtifactWriter:
+    """
+    Append DataFrames to one Parquet artifact as successive row groups, so
+    streaming stages can write results without holding them all in memory.
+    The file appears at path only once close() is called.
+    """
+
+    def __init__(self, path, kind):
+        import pyarrow as pa
+        self.path = path
+        self.kind = kind
+        self.rows = 0
+        arrow_types = {"string": pa.string(), "float64": pa.float64(), "int64": pa.int64()}
+        self.schema = pa.schema([(col, arrow_types[dtype]) for col, dtype in SCHEMAS[kind].items()])
+        self._writer = None
+
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        df = apply_schema(df.reindex(columns=self.schema.names), self.kind)
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self._writer is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._writer = pq.ParquetWriter(self.path + ".tmp", self.schema)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is None:
+            write_artifact(pd.DataFrame(columns=self.schema.names), self.path, self.kind)
+            return
+        self._writer.close()
+        os.replace(self.path + ".tmp", self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
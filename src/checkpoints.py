@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_DIR = "data/manifests"
+
+
+def hash_columns(df, columns):
+    """Stable SHA-1 per row over the given columns."""
+    if len(df) == 0:
+        return pd.Series([], index=df.index, dtype=object)
+    # Column-wise concatenation; a row-wise agg(axis=1) costs a Python call per row
+    parts = [df[c].astype(str) for c in columns]
+    joined = parts[0].str.cat(parts[1:], sep="\x1f", na_rep="nan") if len(parts) > 1 else parts[0].fillna("nan")
+    digests = [hashlib.sha1(v.encode("utf-8")).hexdigest() for v in joined.tolist()]
+    return pd.Series(digests, index=df.index, dtype=object)
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def upsert_rows(existing, new, key_fn, keep=None):
+    """
+    Replace rows of existing whose key appears in new, then append new.
+    If keep is given, existing rows whose key is not in it are dropped, so
+    the output mirrors the stage's current input.
+    """
+    if existing is None or len(existing) == 0:
+        return new.reset_index(drop=True)
+    keys = key_fn(existing)
+    retain = ~keys.isin(set(key_fn(new)))
+    if keep is not None:
+        retain &= keys.isin(keep)
+    return pd.concat([existing[retain], new], ignore_index=True)
+
+
+class StageManifest:
+    """
+    Record of the inputs a pipeline stage has already processed, as
+    {row id: content hash}. Rows whose id is unknown or whose hash differs
+    are the only ones the stage needs to process on an incremental run.
+    """
+
+    def __init__(self, stage, manifest_dir=MANIFEST_DIR):
+        self.stage = stage
+        self.path = os.path.join(manifest_dir, f"{stage}.json")
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def changed(self, ids, hashes):
+        """Boolean mask of rows that are new or whose content changed."""
+        return np.array([self.entries.get(i) != h for i, h in zip(ids, hashes)], dtype=bool)
+
+    def update(self, ids, hashes):
+        self.entries.update(zip(ids, hashes))
+
+    def reset(self):
+        self.entries = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+
+def manifest_for(stage, output_path):
+    # Manifests live next to the stage outputs they describe
+    return StageManifest(stage, os.path.join(os.path.dirname(output_path) or ".", "manifests"))
+
+
+def article_ids(df):
+    return hash_columns(df, ["ticker", "url"])
+
+
+def article_content_hashes(df):
+    return hash_columns(df, ["title", "description", "publishedAt"])
+
+
+EVENT_KEY_COLUMNS = ["ticker", "event_date", "title"]
+
+
+def _event_keys(df):
+    # Scored news and feature rows both identify an event by ticker, day and headline
+    if "event_date" in df.columns:
+        event_date = df["event_date"].astype(str)
+    else:
+        event_date = df["publishedAt"].astype(str).str[:10]
+    return pd.DataFrame({"ticker": df["ticker"].astype(str), "event_date": event_date,
+                         "title": df["title"].astype(str)}, index=df.index)
+
+
+def event_ids(df):
+    return hash_columns(_event_keys(df), EVENT_KEY_COLUMNS)
+
+
+def event_row_counts(events_df, rows_df):
+    """Number of rows_df rows (e.g. feature rows) per event of events_df, matched on the key columns without hashing."""
+    counts = _event_keys(rows_df).value_counts().rename("rows").reset_index()
+    matched = _event_keys(events_df).merge(counts, on=EVENT_KEY_COLUMNS, how="left")
+    return matched["rows"].fillna(0).to_numpy()
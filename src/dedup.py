@@ -0,0 +1,146 @@
+import hashlib
+import re
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard usually share a band
+SIMILARITY_THRESHOLD = 0.6
+SHINGLE_SIZE = 5
+MAX_INDEX_ITEMS = 100_000
+# Columns deduplicate_news() adds to the canonical row
+DEDUP_COLUMNS = ["tickers", "duplicate_count"]
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def article_text(title, description):
+    text = f"{title or ''} {description or ''}".lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of recently seen articles. Signatures are banded into
+    hash buckets; a candidate sharing a bucket counts as a near-duplicate
+    when its estimated Jaccard similarity reaches the threshold. Only the
+    max_items most recently matched articles are kept, so memory is bounded.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=SIMILARITY_THRESHOLD,
+                 max_items=MAX_INDEX_ITEMS, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_items = max_items
+        self._signatures = OrderedDict()
+        self._buckets = {}
+
+    def signature(self, text):
+        hashed = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles(text)),
+            dtype=np.uint64,
+        )
+        perms = (self._a[:, None] * hashed[None, :] + self._b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return perms.min(axis=1)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def query(self, signature):
+        """Key of the most similar indexed article at or above the threshold, else None."""
+        best_key, best_sim = None, self.threshold
+        seen = set()
+        for band_key in self._band_keys(signature):
+            for key in self._buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                sim = float(np.mean(self._signatures[key] == signature))
+                if sim >= best_sim:
+                    best_key, best_sim = key, sim
+        if best_key is not None:
+            self._signatures.move_to_end(best_key)
+        return best_key
+
+    def add(self, key, signature):
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+        while len(self._signatures) > self.max_items:
+            old_key, old_sig = self._signatures.popitem(last=False)
+            for band_key in self._band_keys(old_sig):
+                bucket = self._buckets.get(band_key)
+                if bucket is not None:
+                    bucket.remove(old_key)
+                    if not bucket:
+                        del self._buckets[band_key]
+
+    def __len__(self):
+        return len(self._signatures)
+
+
+def deduplicate_news(news_df):
+    """
+    Collapse near-duplicate articles (syndicated copies under other URLs or
+    tickers) onto the first copy seen. The canonical row keeps every ticker
+    in `tickers` (";"-separated) and the number of copies in `duplicate_count`.
+    Every call builds its own index over news_df's rows; rows from an
+    earlier pass are deduplicated again by passing them in with the new ones.
+    Returns (deduplicated DataFrame, dedup ratio).
+    """
+    if len(news_df) == 0:
+        return news_df.assign(tickers=pd.Series(dtype="string"), duplicate_count=pd.Series(dtype="int64")), 0.0
+    index = NearDuplicateIndex()
+    tickers = {}
+    counts = {}
+    titles = news_df["title"].tolist()
+    descriptions = news_df["description"].tolist() if "description" in news_df.columns else [""] * len(news_df)
+    # Rows that went through an earlier dedup pass already carry a ticker list and copy count
+    if "tickers" in news_df.columns:
+        previous = news_df["tickers"].fillna(news_df["ticker"]).tolist()
+    else:
+        previous = news_df["ticker"].tolist()
+    if "duplicate_count" in news_df.columns:
+        copies = pd.to_numeric(news_df["duplicate_count"], errors="coerce").fillna(1).astype("int64").tolist()
+    else:
+        copies = [1] * len(news_df)
+    for i, (title, description, row_tickers, row_copies) in enumerate(zip(titles, descriptions, previous, copies)):
+        sig = index.signature(article_text(title if pd.notna(title) else "",
+                                           description if pd.notna(description) else ""))
+        canonical = index.query(sig)
+        if canonical is None:
+            canonical = i
+            index.add(i, sig)
+            tickers[i], counts[i] = [], 0
+        for t in str(row_tickers).split(";"):
+            if t not in tickers[canonical]:
+                tickers[canonical].append(t)
+        counts[canonical] += row_copies
+    keep = sorted(tickers)
+    deduped = news_df.iloc[keep].copy()
+    deduped["tickers"] = [";".join(tickers[i]) for i in keep]
+    deduped["duplicate_count"] = [counts[i] for i in keep]
+    ratio = 1 - len(deduped) / len(news_df)
+    return deduped.reset_index(drop=True), ratio
+
+
+def explode_tickers(news_df):
+    """One row per (article, ticker) from a deduplicated frame's `tickers` column."""
+    if "tickers" not in news_df.columns:
+        return news_df
+    exploded = news_df.assign(ticker=news_df["tickers"].fillna(news_df["ticker"]).astype(str).str.split(";"))
+    return exploded.explode("ticker", ignore_index=True)
@@ -0,0 +1,64 @@
+import re
+
+# Keyword -> ESG pillar; None marks generic terms that only count towards relevance
+ESG_KEYWORD_CATEGORIES = {
+    "sustainability": "E",
+    "emissions": "E",
+    "diversity": "S",
+    "governance": "G",
+    "climate": "E",
+    "ESG": None,
+    "carbon": "E",
+    "renewable": "E",
+    "green": "E",
+    "social": "S",
+    "responsibility": "S",
+    "inclusion": "S",
+}
+ESG_KEYWORDS = list(ESG_KEYWORD_CATEGORIES)
+CATEGORIES = ("E", "S", "G")
+HIT_COLUMNS = {"E": "e_hits", "S": "s_hits", "G": "g_hits"}
+
+
+class ESGMatcher:
+    """
+    Single-pass, case-insensitive whole-word matcher over all ESG keywords
+    ("green" matches "green bonds" but not "Greenspan"; plural forms count).
+    """
+
+    def __init__(self, keyword_categories=None):
+        keyword_categories = keyword_categories or ESG_KEYWORD_CATEGORIES
+        self._category = {kw.lower(): cat for kw, cat in keyword_categories.items()}
+        # Longest first so overlapping keywords prefer the most specific one
+        alternation = "|".join(re.escape(kw) for kw in sorted(self._category, key=len, reverse=True))
+        self.pattern = re.compile(rf"\b({alternation})s?\b", re.IGNORECASE)
+
+    def is_relevant(self, text):
+        return bool(text) and self.pattern.search(text) is not None
+
+    def tag(self, text):
+        """Keyword hits in text: {"keywords": [...], "esg_categories": "E;S", "e_hits": n, ...}."""
+        keywords = [m.lower() for m in self.pattern.findall(text or "")]
+        counts = {cat: 0 for cat in CATEGORIES}
+        for kw in keywords:
+            cat = self._category[kw]
+            if cat is not None:
+                counts[cat] += 1
+        tags = {HIT_COLUMNS[cat]: n for cat, n in counts.items()}
+        tags["esg_categories"] = ";".join(cat for cat in CATEGORIES if counts[cat])
+        tags["keywords"] = keywords
+        return tags
+
+    def tag_frame(self, df, text_columns=("title", "description")):
+        """Add esg_categories and per-pillar hit counts to a news DataFrame."""
+        text = df[list(text_columns)].fillna("").astype(str).agg(" ".join, axis=1)
+        hits = text.str.findall(self.pattern).map(lambda found: [self._category[k.lower()] for k in found])
+        df = df.copy()
+        for cat in CATEGORIES:
+            df[HIT_COLUMNS[cat]] = hits.map(lambda cats, cat=cat: cats.count(cat)).astype("int64")
+        df["esg_categories"] = hits.map(lambda cats: ";".join(c for c in CATEGORIES if c in cats))
+        df["esg_relevant"] = hits.map(len) > 0
+        return df
+
+
+default_matcher = ESGMatcher()
@@ -0,0 +1,164 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from src.metrics import count, gauge
+
+MAX_BATCH_SIZE = 64
+MAX_WAIT_MS = 10
+MAX_QUEUE = 10_000
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+def _gather(parts):
+    """One Future for the concatenated results of parts, failing if any part fails."""
+    future = Future()
+    lock = threading.Lock()
+    remaining = [len(parts)]
+
+    def part_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        error = next((p.exception() for p in parts if p.exception() is not None), None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result([r for p in parts for r in p.result()])
+
+    for part in parts:
+        part.add_done_callback(part_done)
+    return future
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent scoring requests into dynamic micro-batches run by a
+    single inference worker thread. A batch is flushed once the next request
+    would take it past max_batch_size texts or max_wait_ms has passed since
+    its first request; requests larger than max_batch_size are split. So no
+    batch exceeds max_batch_size. score_fn takes a list of texts and returns
+    one result per text.
+    """
+
+    def __init__(self, score_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, max_queue=MAX_QUEUE):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._texts = 0
+        self._requests = 0
+        self._errors = 0
+        self._busy_seconds = 0.0
+        self._histogram = {b: 0 for b in BATCH_SIZE_BUCKETS}
+        self._histogram["+Inf"] = 0
+        # A request that did not fit the previous batch opens the next one (worker thread only)
+        self._carry = None
+        self._worker = threading.Thread(target=self._run, name="sentiment-inference", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts):
+        """Queue texts for scoring; returns a Future resolving to their results."""
+        texts = list(texts)
+        if len(texts) <= self.max_batch_size:
+            return self._enqueue(texts)
+        parts = [self._enqueue(texts[i:i + self.max_batch_size]) for i in range(0, len(texts), self.max_batch_size)]
+        return _gather(parts)
+
+    def _enqueue(self, texts):
+        future = Future()
+        if not texts:
+            future.set_result([])
+            return future
+        try:
+            self._queue.put_nowait((texts, future))
+        except queue.Full:
+            raise QueueFullError("inference queue is full")
+        return future
+
+    def score(self, texts, timeout=None):
+        return self.submit(texts).result(timeout)
+
+    async def score_async(self, texts):
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def _collect(self):
+        first, self._carry = self._carry or self._queue.get(), None
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if size + len(item[0]) > self.max_batch_size:
+                self._carry = item
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch, size
+
+    def _run(self):
+        while True:
+            batch, size = self._collect()
+            texts = [t for item_texts, _ in batch for t in item_texts]
+            started = time.monotonic()
+            try:
+                results = self.score_fn(texts)
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.monotonic() - started
+            offset = 0
+            for item_texts, future in batch:
+                future.set_result(results[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+            with self._lock:
+                self._batches += 1
+                self._texts += size
+                self._requests += len(batch)
+                self._busy_seconds += elapsed
+                bucket = next((b for b in BATCH_SIZE_BUCKETS if size <= b), "+Inf")
+                self._histogram[bucket] += 1
+            count("inference_batches")
+            count("inference_texts", size)
+
+    def publish(self):
+        """Copy the current queue depth and batch sizes into the metrics registry, e.g. before a /metrics scrape."""
+        stats = self.stats()
+        gauge("inference_queue_depth", stats["queue_depth"])
+        gauge("inference_mean_batch_size", stats["mean_batch_size"])
+        gauge("inference_max_batch_size", stats["max_batch_size"])
+        for bucket, n in stats["batch_size_histogram"].items():
+            gauge("inference_batches_by_size", n, max_size=bucket)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "errors": self._errors,
+                "mean_batch_size": self._texts / self._batches if self._batches else 0.0,
+                "inference_seconds": self._busy_seconds,
+                "batch_size_histogram": {str(k): v for k, v in self._histogram.items()},
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
@@ -1,228 +1,75 @@
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import streamlit as st
 import pandas as pd
-import time
-import yfinance as yf
-from datetime import datetime, timedelta
-import requests
+from src.news_client import GNewsClient
+from src.esg_matcher import default_matcher, ESG_KEYWORDS
+from src.price_store import get_default_store
+from src.dedup import deduplicate_news, explode_tickers
+from src.artifacts import NEWS_SCHEMA, read_artifact, write_artifact
+from src.abnormal_return_calc import compute_event_features
+from src.metrics import get_logger
 
-# ESG News Ingestion
-ESG_KEYWORDS = [
-    "sustainability", "emissions", "diversity", "governance", "climate", "ESG",
-    "carbon", "renewable", "green", "social", "responsibility", "inclusion"
-]
-GNEWS_API_KEY = "YOUR_GNEWS_API_KEY"  # <-- Set this via Streamlit secrets or env
-GNEWS_ENDPOINT = "https://gnews.io/api/v4/search"
-SP500_TICKER = "^GSPC"
-VIX_TICKER = "^VIX"
+logger = get_logger("ingestion")
 
+GNEWS_API_KEY = os.environ.get("GNEWS_API_KEY", "YOUR_GNEWS_API_KEY")  # <-- Set this via Streamlit secrets or env
 
-def fetch_esg_news_for_ticker(ticker, max_articles=10):
-    # Build query string with ESG keywords
-    query = f"{ticker} (" + " OR ".join(ESG_KEYWORDS) + ")"
-    params = {
-        "q": query,
-        "token": GNEWS_API_KEY,
-        "lang": "en",
-        "max": max_articles,
-        "sort_by": "publishedAt"
-    }
-    response = requests.get(GNEWS_ENDPOINT, params=params)
-    if response.status_code != 200:
-        print(f"Failed to fetch news for {ticker}: {response.text}")
-        return []
-    articles = response.json().get("articles", [])
-    # Filter articles for ESG keywords in title/description
+
+def build_esg_query(ticker):
+    return f"{ticker} (" + " OR ".join(ESG_KEYWORDS) + ")"
+
+def filter_esg_articles(ticker, articles):
+    # Keep ESG-relevant articles, tagged with their E/S/G keyword hit counts
     filtered = []
     for a in articles:
-        text = (a.get("title", "") + " " + a.get("description", "")).lower()
-        if any(kw.lower() in text for kw in ESG_KEYWORDS):
+        tags = default_matcher.tag((a.get("title") or "") + " " + (a.get("description") or ""))
+        if tags["keywords"]:
             filtered.append({
                 "ticker": ticker,
                 "title": a.get("title", ""),
                 "description": a.get("description", ""),
                 "publishedAt": a.get("publishedAt", ""),
-                "url": a.get("url", "")
+                "url": a.get("url", ""),
+                "esg_categories": tags["esg_categories"],
+                "e_hits": tags["e_hits"],
+                "s_hits": tags["s_hits"],
+                "g_hits": tags["g_hits"]
             })
     return filtered
 
-def fetch_esg_news_for_portfolio():
-    df = pd.read_csv("data/user_portfolio.csv")
+def fetch_esg_news_for_ticker(ticker, max_articles=10, client=None):
+    client = client or GNewsClient(GNEWS_API_KEY)
+    articles = client.search(build_esg_query(ticker), max_articles)
+    return filter_esg_articles(ticker, articles)
+
+def fetch_esg_news_for_portfolio(portfolio_csv="data/user_portfolio.csv", output_path="data/sample_news.parquet", client=None):
+    df = pd.read_csv(portfolio_csv)
+    tickers = list(dict.fromkeys(df["ticker"]))
+    logger.info("Fetching news for %d tickers...", len(tickers))
+    client = client or GNewsClient(GNEWS_API_KEY)
+    results = client.search_many({t: build_esg_query(t) for t in tickers})
     all_news = []
-    for ticker in df["ticker"]:
-        print(f"Fetching news for {ticker}...")
-        news = fetch_esg_news_for_ticker(ticker)
-        all_news.extend(news)
-        time.sleep(1)  # avoid rate limits
-    news_df = pd.DataFrame(all_news)
-    news_df.to_csv("data/sample_news.csv", index=False)
-    print(f"Saved {len(news_df)} news articles to data/sample_news.csv")
+    for ticker, articles in results.items():
+        all_news.extend(filter_esg_articles(ticker, articles))
+    news_df = pd.DataFrame(all_news, columns=list(NEWS_SCHEMA))
+    news_df, dedup_ratio = deduplicate_news(news_df)
+    logger.info("Removed %.1f%% near-duplicate articles", 100 * dedup_ratio)
+    write_artifact(news_df, output_path, "news")
+    logger.info("Saved %d news articles to %s", len(news_df), output_path)
 
-def get_price_data(ticker, start_date, end_date):
-    return yf.download(ticker, start=start_date, end=end_date, progress=False)
+def get_price_data(ticker, start_date, end_date, store=None):
+    return (store or get_default_store()).window(ticker, start_date, end_date)
 
-def calculate_market_features(news_csv="data/sample_news_scored.csv", output_csv="data/market_features.csv"):
-    news_df = pd.read_csv(news_csv)
-    features = []
-    print(f"Processing {len(news_df)} news events...")
-    
-    # Extract scalar values from Series
-    def extract_scalar(value):
-        # Handle pandas Series
-        if hasattr(value, 'iloc'):
-            if len(value) > 0:
-                val = value.iloc[0]
-                return float(val) if not pd.isna(val) else None
-            else:
-                return None
-        elif hasattr(value, 'item'):
-            try:
-                val = value.item()
-                return float(val) if not pd.isna(val) else None
-            except:
-                return None
-        else:
-            # Handle scalar values
-            try:
-                if pd.isna(value):
-                    return None
-                return float(value)
-            except:
-                return None
-    
-    for idx, row in news_df.iterrows():
-        ticker = row["ticker"]
-        event_date = row["publishedAt"][:10]  # YYYY-MM-DD
-        print(f"Processing {ticker} on {event_date}...")
-        try:
-            event_dt = datetime.strptime(event_date, "%Y-%m-%d")
-            # Skip future dates
-            if event_dt > datetime.now():
-                print(f"  Skipping future date: {event_date}")
-                continue
-        except Exception as e:
-            print(f"  Error parsing date {event_date}: {e}")
-            continue
-        # Define windows
-        estimation_start = (event_dt - timedelta(days=80)).strftime("%Y-%m-%d")
-        estimation_end = (event_dt - timedelta(days=6)).strftime("%Y-%m-%d")
-        event_window_start = (event_dt - timedelta(days=5)).strftime("%Y-%m-%d")
-        event_window_end = (event_dt + timedelta(days=5)).strftime("%Y-%m-%d")
-        print(f"  Windows: estimation={estimation_start} to {estimation_end}, event={event_window_start} to {event_window_end}")
-        # Fetch prices
-        try:
-            stock_prices = get_price_data(ticker, estimation_start, event_window_end)
-            sp500_prices = get_price_data(SP500_TICKER, estimation_start, event_window_end)
-            vix_prices = get_price_data(VIX_TICKER, event_window_start, event_window_end)
-            print(f"  Got {len(stock_prices)} stock prices, {len(sp500_prices)} S&P500 prices, {len(vix_prices)} VIX prices")
-        except Exception as e:
-            print(f"  Error fetching data for {ticker}: {e}")
-            continue
-        # Calculate daily returns
-        # Handle multi-level column names from yfinance
-        close_col = None
-        if "Close" in stock_prices.columns:
-            close_col = "Close"
-        elif ("Close", ticker) in stock_prices.columns:
-            close_col = ("Close", ticker)
-        else:
-            print(f"  Ticker {ticker}: 'Close' column missing. Columns: {stock_prices.columns.tolist()}. Skipping.")
-            continue
-            
-        sp500_close_col = None
-        if "Close" in sp500_prices.columns:
-            sp500_close_col = "Close"
-        elif ("Close", SP500_TICKER) in sp500_prices.columns:
-            sp500_close_col = ("Close", SP500_TICKER)
-        else:
-            print(f"  S&P500: 'Close' column missing. Columns: {sp500_prices.columns.tolist()}. Skipping.")
-            continue
-            
-        stock_returns = stock_prices[close_col].pct_change().dropna()
-        sp500_returns = sp500_prices[sp500_close_col].pct_change().dropna()
-        # Market model regression (estimation window)
-        est_stock = stock_returns.loc[estimation_start:estimation_end]
-        est_sp500 = sp500_returns.loc[estimation_start:estimation_end]
-        if len(est_stock) < 10 or len(est_sp500) < 10:
-            print(f"  Insufficient data for regression: {len(est_stock)} stock returns, {len(est_sp500)} S&P500 returns")
-            continue
-        try:
-            import statsmodels.api as sm
-            X = sm.add_constant(est_sp500.values)
-            y = est_stock.values
-            model = sm.OLS(y, X).fit()
-            alpha, beta = model.params
-            print(f"  Regression successful: alpha={alpha:.4f}, beta={beta:.4f}")
-        except Exception as e:
-            print(f"  Regression error for {ticker}: {e}")
-            continue
-        # Event window actual/expected/abnormal returns
-        event_features = 0
-        for offset in range(-3, 4):  # T-3 to T+3
-            day = (event_dt + timedelta(days=offset)).strftime("%Y-%m-%d")
-            if day not in stock_returns.index or day not in sp500_returns.index:
-                continue
-            actual_return = stock_returns.loc[day]
-            expected_return = alpha + beta * sp500_returns.loc[day]
-            
-            # Extract scalar values first
-            actual_scalar = extract_scalar(actual_return)
-            expected_scalar = extract_scalar(expected_return)
-            
-            # Calculate abnormal return
-            if actual_scalar is not None and expected_scalar is not None:
-                abnormal_return = actual_scalar - expected_scalar
-            else:
-                abnormal_return = None
-            
-            # Debug: print the values
-            actual_str = f"{actual_scalar:.6f}" if actual_scalar is not None else "None"
-            expected_str = f"{expected_scalar:.6f}" if expected_scalar is not None else "None"
-            abnormal_str = f"{abnormal_return:.6f}" if abnormal_return is not None else "None"
-            print(f"    Day {day}: actual={actual_str}, expected={expected_str}, abnormal={abnormal_str}")
-            
-            # Momentum: % change over last 5 days
-            try:
-                momentum = (stock_prices.loc[day, close_col] / stock_prices.loc[:day].iloc[-6][close_col]) - 1
-            except Exception:
-                momentum = None
-            # VIX value
-            vix_close_col = None
-            if "Close" in vix_prices.columns:
-                vix_close_col = "Close"
-            elif ("Close", VIX_TICKER) in vix_prices.columns:
-                vix_close_col = ("Close", VIX_TICKER)
-            else:
-                print(f"    VIX columns available: {vix_prices.columns.tolist()}")
-                vix_value = None
-            if vix_close_col:
-                vix_value = vix_prices[vix_close_col].get(day, None)
-                print(f"    VIX for {day}: {vix_value}")
-            else:
-                vix_value = None
-                
-            features.append({
-                "ticker": ticker,
-                "event_date": event_date,
-                "window_day": offset,
-                "actual_return": extract_scalar(actual_return),
-                "expected_return": extract_scalar(expected_return),
-                "abnormal_return": extract_scalar(abnormal_return),
-                "momentum": extract_scalar(momentum) if momentum is not None else None,
-                "vix": extract_scalar(vix_value) if vix_value is not None else None,
-                "sentiment_label": row["sentiment_label"],
-                "sentiment_score": float(row["sentiment_score"]) if not pd.isna(row["sentiment_score"]) else None,
-                "title": row["title"]
-            })
-            event_features += 1
-        print(f"  Generated {event_features} features for this event")
-    features_df = pd.DataFrame(features)
-    features_df.to_csv(output_csv, index=False)
-    print(f"Saved {len(features_df)} market features to {output_csv}")
+def calculate_market_features(news_path="data/sample_news_scored.parquet", output_path="data/market_features.parquet", store=None):
+    news_df = explode_tickers(read_artifact(news_path, "scored"))
+    logger.info("Processing %d news events...", len(news_df))
+    features_df = compute_event_features(news_df, store or get_default_store())
+    write_artifact(features_df, output_path, "features")
+    logger.info("Saved %d market features to %s", len(features_df), output_path)
 
 if __name__ == "__main__":
+    from src.metrics import configure_logging
+    configure_logging()
     # Uncomment to run this step
     # fetch_esg_news_for_portfolio()
     calculate_market_features()
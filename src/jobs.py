@@ -0,0 +1,184 @@
+import hashlib
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src.artifacts import artifact_exists, resolve_artifact
+from src.checkpoints import file_hash
+from src.planner import PortfolioPlan, StageTimer, record_throughput
+
+JOBS_ROOT = os.path.join("data", "runs")
+JOB_WORKERS = int(os.environ.get("PIPELINE_JOB_WORKERS", "2"))
+# A finished run is handed to identical requests for this long before a new run starts
+JOB_REUSE_SECONDS = 15 * 60
+STAGES = ("fetch", "score", "features", "regression")
+
+
+def portfolio_key(tickers, incremental=True):
+    """Stable id for a portfolio request; identical requests share a run."""
+    payload = ",".join(sorted({t.strip().upper() for t in tickers})) + f"|incremental={bool(incremental)}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Job:
+    """One pipeline run over a portfolio, with its own run directory and progress log."""
+
+    def __init__(self, key, tickers, incremental, root=JOBS_ROOT):
+        self.id = key
+        self.tickers = sorted({t.strip().upper() for t in tickers})
+        self.incremental = incremental
+        self.run_dir = os.path.join(root, key)
+        self.state = "queued"
+        self.stage = None
+        self.results = None
+        # Hash of the finished run's features artifact; the dashboard keys its caches on it
+        self.features_hash = None
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self._events = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def path(self, name):
+        return os.path.join(self.run_dir, name)
+
+    @property
+    def features_path(self):
+        return self.path("market_features.parquet")
+
+    def progress(self, stage, message):
+        with self._lock:
+            self.stage = stage
+            self._events.append({"time": time.time(), "stage": stage, "message": message})
+
+    def events(self, since=0):
+        """Progress events from index since onwards, so a poller only gets new ones."""
+        with self._lock:
+            return list(self._events[since:])
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _finish(self, state, results=None, error=None):
+        self.state, self.results, self.error = state, results, error
+        self.finished = time.time()
+        self._done.set()
+
+
+def run_portfolio_job(job):
+    """Run ingest -> score -> features -> regression with every artifact inside job.run_dir."""
+    # Deferred so importing the job runner does not load the pipeline stack
+    from pipeline import fetch_esg_news_for_portfolio, calculate_market_features, get_gnews_api_key
+    from models.sentiment_model import score_news_sentiment
+    from models.regression_model import run_regression, load_factor_data
+    from src.artifacts import artifact_exists, read_artifact
+    from src.news_client import GNewsClient
+
+    # A fresh run measures every stage end to end; incremental reruns would overstate throughput
+    measure = not (job.incremental and artifact_exists(job.features_path))
+    os.makedirs(job.run_dir, exist_ok=True)
+    portfolio_csv = job.path("user_portfolio.csv")
+    pd.DataFrame({"ticker": job.tickers}).to_csv(portfolio_csv, index=False)
+    news_path, scored_path = job.path("news.parquet"), job.path("news_scored.parquet")
+    plan = PortfolioPlan(job.tickers)
+    job.progress("plan", plan.describe())
+    timer = StageTimer()
+
+    timer.start("fetch")
+    job.progress("fetch", f"Fetching ESG news for {len(job.tickers)} tickers")
+    client = GNewsClient(get_gnews_api_key(), max_workers=plan.news_workers)
+    try:
+        fetch_esg_news_for_portfolio(portfolio_csv, news_path, client=client, incremental=job.incremental)
+    finally:
+        client.close()
+    timer.start("score")
+    job.progress("score", "Scoring sentiment")
+    score_news_sentiment(news_path, scored_path, incremental=job.incremental)
+    timer.start("features")
+    job.progress("features", "Building market features")
+    calculate_market_features(scored_path, job.features_path, incremental=job.incremental)
+    timer.start("regression")
+    job.progress("regression", "Running regression analysis")
+    data = load_factor_data(job.features_path)
+    _, results = run_regression(job.features_path, incremental=job.incremental, data=data)
+    timer.stop()
+    if measure:
+        headlines = len(read_artifact(news_path, "news", columns=["ticker"]))
+        record_throughput(timer.measurements(len(job.tickers), headlines))
+    return results
+
+
+class JobRunner:
+    """
+    Queues pipeline runs on a local worker pool. Requests for a portfolio
+    that is already queued or running, or that finished less than
+    reuse_seconds ago, get the existing job instead of a new run.
+    """
+
+    def __init__(self, root=JOBS_ROOT, workers=JOB_WORKERS, run_fn=run_portfolio_job,
+                 reuse_seconds=JOB_REUSE_SECONDS):
+        self.root = root
+        self.run_fn = run_fn
+        self.reuse_seconds = reuse_seconds
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, tickers, incremental=True):
+        key = portfolio_key(tickers, incremental)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and (not job.done or (
+                    job.state == "done" and time.time() - job.finished < self.reuse_seconds)):
+                return job
+            job = Job(key, tickers, incremental, self.root)
+            self._jobs[key] = job
+        job.progress("queued", "Waiting for a worker")
+        self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        job.state = "running"
+        try:
+            results = self.run_fn(job)
+        except Exception as e:
+            job.progress("failed", f"{type(e).__name__}: {e}")
+            job._finish("failed", error=traceback.format_exc())
+            return
+        if artifact_exists(job.features_path):
+            job.features_hash = file_hash(resolve_artifact(job.features_path))
+        job.progress("done", "Analysis complete")
+        job._finish("done", results=results)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+_default_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    global _default_runner
+    if _default_runner is None:
+        with _runner_lock:
+            if _default_runner is None:
+                _default_runner = JobRunner()
+    return _default_runner
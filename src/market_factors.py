@@ -0,0 +1,154 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from src.trading_calendar import TradingCalendar
+from src.price_store import completed_sessions_end
+from src.metrics import timed, count
+
+SP500_TICKER = "^GSPC"
+VIX_TICKER = "^VIX"
+MARKET_VOL_WINDOW = 20  # trading days in the rolling market volatility
+
+# name -> fn(factors) returning an array aligned with factors.dates; see register_factor
+FACTORS = {}
+
+
+def register_factor(name):
+    """
+    Declare a derived market factor. The decorated function receives the
+    MarketFactors instance (its base arrays and every other factor by name)
+    and returns one value per trading day. It runs at most once per loaded
+    range, from series already in memory, so new factors cost no downloads.
+    """
+    def decorator(fn):
+        FACTORS[name] = fn
+        return fn
+    return decorator
+
+
+@register_factor("market_return")
+def _market_return(f):
+    returns = np.full(len(f.market_close), np.nan)
+    returns[1:] = f.market_close[1:] / f.market_close[:-1] - 1
+    return returns
+
+
+@register_factor("vix")
+def _vix(f):
+    return f.vix_close
+
+
+@register_factor("vix_change")
+def _vix_change(f):
+    change = np.full(len(f.vix_close), np.nan)
+    change[1:] = np.diff(f.vix_close)
+    return change
+
+
+@register_factor("market_vol")
+def _market_vol(f):
+    return pd.Series(f["market_return"]).rolling(MARKET_VOL_WINDOW, min_periods=MARKET_VOL_WINDOW).std().to_numpy()
+
+
+class MarketFactors:
+    """
+    S&P 500 and VIX series on the S&P trading calendar, plus every
+    registered factor derived from them, as aligned float64 arrays. Factors
+    are computed on first access and kept; window() slices all of them
+    without recomputing, so rolling factors keep their full history.
+    """
+
+    def __init__(self, dates, market_close, vix_close, span=None, computed=None):
+        self.calendar = TradingCalendar(dates)
+        self.dates = self.calendar.dates
+        self.market_close = np.asarray(market_close, dtype="float64")
+        self.vix_close = np.asarray(vix_close, dtype="float64")
+        # Requested [start, end) range; trading days may not reach either edge
+        self.span = span
+        self._computed = dict(computed or {})
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, store, start, end):
+        """One read of each benchmark series from the price store for start <= date < end."""
+        with timed("features", "market_factors"):
+            market = store.window(SP500_TICKER, start, end)["Close"]
+            store.ensure(VIX_TICKER, start, end)
+            vix = store.get(VIX_TICKER)["Close"].reindex(market.index)
+            factors = cls(market.index, market.to_numpy(dtype="float64"), vix.to_numpy(dtype="float64"),
+                          span=(start, end))
+            # Every registered factor up front, over the full range, so slices never recompute
+            for name in FACTORS:
+                factors[name]
+        count("market_factor_loads")
+        return factors
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, name):
+        values = self._computed.get(name)
+        if values is None:
+            if name not in FACTORS:
+                raise KeyError(f"Unknown market factor {name!r}; registered: {sorted(FACTORS)}")
+            values = np.asarray(FACTORS[name](self), dtype="float64")
+            with self._lock:
+                self._computed.setdefault(name, values)
+        return values
+
+    @property
+    def names(self):
+        return list(FACTORS)
+
+    def covers(self, start, end):
+        return self.span is not None and self.span[0] <= start and end <= self.span[1]
+
+    def window(self, start, end):
+        """The trading days start <= date < end, sharing the already computed factor arrays."""
+        lo, hi = np.searchsorted(self.dates.values, [start.to_datetime64(), end.to_datetime64()])
+        computed = {name: values[lo:hi] for name, values in self._computed.items()}
+        return MarketFactors(self.dates[lo:hi], self.market_close[lo:hi], self.vix_close[lo:hi],
+                             span=(start, end), computed=computed)
+
+    def asof(self, timestamps, names):
+        """
+        {name: values} for the last trading day on or before each timestamp,
+        e.g. to give alert records the market state they were published in.
+        """
+        days = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).tz_localize(None).normalize()
+        pos = np.searchsorted(self.dates.values, days.values, side="right") - 1
+        valid = pos >= 0
+        pos = np.clip(pos, 0, max(len(self) - 1, 0))
+        return {name: np.where(valid, self[name][pos], np.nan) if len(self) else np.full(len(pos), np.nan)
+                for name in names}
+
+    def frame(self, names=None):
+        return pd.DataFrame({name: self[name] for name in (names or self.names)}, index=self.dates)
+
+
+_cache = weakref.WeakKeyDictionary()
+_cache_lock = threading.Lock()
+
+
+def market_factors(store, start, end):
+    """
+    MarketFactors for start <= date < end from a per-store cache: a run (or
+    a stream of feature micro-batches) loads the benchmark series once and
+    later requests inside the loaded range are slices of it. A request
+    outside it reloads the union of both ranges.
+    """
+    start = pd.Timestamp(start).normalize()
+    # Like the price store, stop at the last settled session: later days are reloaded once they close
+    end = min(pd.Timestamp(end).normalize(), completed_sessions_end())
+    with _cache_lock:
+        cached = _cache.get(store)
+        if cached is None or not cached.covers(start, end):
+            load_start, load_end = start, end
+            if cached is not None:
+                load_start, load_end = min(start, cached.span[0]), max(end, cached.span[1])
+            cached = MarketFactors.load(store, load_start, load_end)
+            _cache[store] = cached
+    return cached.window(start, end)
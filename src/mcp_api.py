@@ -1,47 +1,93 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from flask import Flask, request, jsonify
-from transformers import pipeline
-import numpy as np
-import statsmodels.api as sm
+import functools
+import time
+from flask import Flask, Response, g, request, jsonify
+from models.sentiment_model import score_texts, warm_up
+from models.factor_model import FactorModel
+from src.alert_engine import default_engine as alert_engine
+from src.inference_server import MicroBatcher, QueueFullError
+from src.metrics import metrics, count
 
 app = Flask(__name__)
 
-# Sentiment pipeline using FinBERT (placeholder)
-sentiment_pipeline = pipeline("sentiment-analysis", model="ProsusAI/finbert")
+# "batched" coalesces concurrent requests on one inference worker; "direct" scores per request
+SERVING_MODE = os.environ.get("SENTIMENT_SERVING_MODE", "batched")
+MAX_BATCH_SIZE = int(os.environ.get("SENTIMENT_MAX_BATCH_SIZE", "64"))
+# A coalesced batch goes through the model in one forward pass, not in score_texts' default chunks
+batcher = MicroBatcher(
+    functools.partial(score_texts, batch_size=MAX_BATCH_SIZE),
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=float(os.environ.get("SENTIMENT_MAX_WAIT_MS", "10")),
+) if SERVING_MODE == "batched" else None
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    if endpoint != "/metrics":
+        metrics.observe("esg_api_request_seconds", time.perf_counter() - g.request_start, endpoint=endpoint)
+        count("api_requests", endpoint=endpoint, status=str(response.status_code))
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Stage and sub-step timers from everything this process has run, in Prometheus text format
+    if batcher is not None:
+        batcher.publish()
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route('/sentiment-score', methods=['POST'])
 def sentiment_score():
     data = request.json
     texts = data.get("texts", [])
-    results = sentiment_pipeline(texts)
+    if isinstance(texts, str):
+        texts = [texts]
+    # Goes through the same on-disk cache as the batch scorer
+    if batcher is None:
+        scored = score_texts(texts)
+    else:
+        try:
+            scored = batcher.score(texts)
+        except QueueFullError:
+            return jsonify({"error": "inference queue is full, retry later"}), 503
+    results = [{"label": label, "score": score} for label, score in scored]
     return jsonify(results)
 
+@app.route('/sentiment-score/stats', methods=['GET'])
+def sentiment_score_stats():
+    if batcher is None:
+        return jsonify({"serving_mode": SERVING_MODE})
+    return jsonify(dict(batcher.stats(), serving_mode=SERVING_MODE))
+
 @app.route('/run-analysis', methods=['POST'])
 def run_analysis():
     data = request.json
-    y = np.array(data["abnormal_returns"])
-    X = np.column_stack([
-        data["sentiment_scores"],
-        data["sector_dummies"],
-        data["vix_values"],
-        data["momentums"]
-    ])
-    X = sm.add_constant(X)
-    model = sm.OLS(y, X).fit()
+    # Same factor-model path as the CLI and dashboard; sector dummies expand to sector_0..k
+    factor_model, frame = FactorModel.from_arrays(
+        data["abnormal_returns"],
+        sentiment_score=data["sentiment_scores"],
+        sector=data["sector_dummies"],
+        vix=data["vix_values"],
+        momentum=data["momentums"],
+    )
+    model = factor_model.prepare(frame).fit()
     summary = model.summary().as_text()
     return jsonify({"model_summary": summary})
 
 @app.route('/generate-alerts', methods=['POST'])
 def generate_alerts():
     data = request.json
-    alerts = []
-    for record in data["records"]:
-        if record["sentiment_score"] < -0.5 and record["sector"] in ["energy", "consumer_goods"]:
-            alerts.append({
-                "ticker": record["ticker"],
-                "alert": "⚠️ Negative ESG sentiment detected. Monitor closely."
-            })
+    # Whole batch at once through the compiled rules
+    fired = alert_engine.evaluate(data["records"])
+    alerts = [{"ticker": ticker, "alert": alert} for ticker, alert in zip(fired["ticker"], fired["alert"])]
     return jsonify(alerts)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
+    # Load FinBERT before accepting traffic rather than on the first request
+    warm_up()
+    app.run(host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,219 @@
+import bisect
+import contextlib
+import logging
+import os
+import threading
+import time
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+STAGE_SECONDS = "esg_stage_seconds"
+PROFILERS = ("cprofile", "sampling")
+
+
+def get_logger(name):
+    return logging.getLogger(f"esg.{name}")
+
+
+def configure_logging(level=LOG_LEVEL):
+    """Plain-message console logging for the command-line entry points; library code only logs."""
+    logging.basicConfig(format="%(message)s", level=getattr(logging, str(level).upper(), logging.INFO))
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges and latency histograms keyed by metric
+    name and labels. render() produces the Prometheus text exposition
+    format, so the registry can back a /metrics endpoint directly. With
+    keep_samples every observation is also kept as-is, for exact
+    percentiles in benchmarks.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, keep_samples=False):
+        self.buckets = tuple(buckets)
+        self.keep_samples = keep_samples
+        self._samples = {}
+        self._counters = {}
+        self._gauges = {}
+        # (name, labels) -> [per-bucket counts..., +Inf count, sum, max]
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0.0]
+            hist[slot] += 1
+            hist[-2] += seconds
+            hist[-1] = max(hist[-1], seconds)
+            if self.keep_samples:
+                self._samples.setdefault(key, []).append(seconds)
+
+    def samples(self, name, **labels):
+        """Raw observations of a histogram series recorded while keep_samples was on."""
+        with self._lock:
+            return list(self._samples.get((name, _label_key(labels)), ()))
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """{"counters"/"gauges": {series: value}, "timers": {series: {"count", "sum", "max"}}} for logs and JSON dumps."""
+        with self._lock:
+            counters = {name + _format_labels(key): v for (name, key), v in self._counters.items()}
+            gauges = {name + _format_labels(key): v for (name, key), v in self._gauges.items()}
+            timers = {
+                name + _format_labels(key): {"count": sum(h[:-2]), "sum": h[-2], "max": h[-1]}
+                for (name, key), h in self._histograms.items()
+            }
+        return {"counters": counters, "gauges": gauges, "timers": timers}
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((k, list(h)) for k, h in self._histograms.items())
+        lines = []
+        last = None
+        for (name, key), value in counters:
+            if name != last:
+                lines.append(f"# TYPE {name} counter")
+                last = name
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        for (name, key), value in gauges:
+            if name != last:
+                lines.append(f"# TYPE {name} gauge")
+                last = name
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        for (name, key), hist in histograms:
+            if name != last:
+                lines.append(f"# TYPE {name} histogram")
+                last = name
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), hist[:-2]):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(key)} {hist[-2]}")
+            lines.append(f"{name}_count{_format_labels(key)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self._samples.clear()
+
+
+metrics = MetricsRegistry()
+
+
+class _StageTimer(contextlib.ContextDecorator):
+    def __init__(self, stage, step, registry):
+        self.labels = {"stage": stage, "step": step}
+        self.registry = registry
+        self._starts = threading.local()
+
+    def __enter__(self):
+        self._starts.__dict__.setdefault("stack", []).append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        start = self._starts.stack.pop()
+        self.registry.observe(STAGE_SECONDS, time.perf_counter() - start, **self.labels)
+        return False
+
+
+def timed(stage, step="total", registry=None):
+    """
+    Time a pipeline stage or one of its sub-steps into esg_stage_seconds.
+    Works as a context manager or as a function decorator.
+    """
+    return _StageTimer(stage, step, registry or metrics)
+
+
+def count(name, value=1, registry=None, **labels):
+    """Add value to the esg_<name>_total counter."""
+    (registry or metrics).inc(f"esg_{name}_total", value, **labels)
+
+
+def gauge(name, value, registry=None, **labels):
+    """Set the esg_<name> gauge to value."""
+    (registry or metrics).set(f"esg_{name}", value, **labels)
+
+
+@contextlib.contextmanager
+def profiled(mode=None, output=None, top=25):
+    """
+    Profile the enclosed block: "cprofile" dumps pstats to output (default
+    pipeline.prof), "sampling" writes a pyinstrument HTML report (default
+    pipeline_profile.html). The hottest functions are logged either way;
+    mode None profiles nothing.
+    """
+    if not mode:
+        yield
+        return
+    if mode not in PROFILERS:
+        raise ValueError(f"Unknown profiler {mode!r}; expected one of {PROFILERS}")
+    logger = get_logger("profile")
+    if mode == "cprofile":
+        import cProfile
+        import io
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            output = output or "pipeline.prof"
+            profiler.dump_stats(output)
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(top)
+            logger.info("cProfile stats written to %s\n%s", output, report.getvalue())
+        return
+    try:
+        from pyinstrument import Profiler
+    except ImportError as e:
+        raise ImportError("The sampling profiler requires pyinstrument") from e
+    profiler = Profiler()
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        output = output or "pipeline_profile.html"
+        with open(output, "w") as f:
+            f.write(profiler.output_html())
+        logger.info("Sampling profile written to %s\n%s", output, profiler.output_text())
@@ -0,0 +1,120 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.metrics import get_logger, timed, count
+
+logger = get_logger("news_client")
+
+GNEWS_ENDPOINT = os.environ.get("GNEWS_ENDPOINT", "https://gnews.io/api/v4/search")
+# Match these to the per-second limit of your GNews plan
+GNEWS_REQUESTS_PER_SECOND = float(os.environ.get("GNEWS_REQUESTS_PER_SECOND", "4"))
+GNEWS_BURST = int(os.environ.get("GNEWS_BURST", "4"))
+MAX_WORKERS = 8
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+REQUEST_TIMEOUT = (3.05, 10)
+TICKER_TIMEOUT = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class GNewsClient:
+    """
+    Fetches GNews search results for many tickers concurrently over one pooled
+    keep-alive session, with a shared rate limit and retries on 429/5xx.
+    """
+
+    def __init__(self, api_key, endpoint=GNEWS_ENDPOINT, requests_per_second=GNEWS_REQUESTS_PER_SECOND,
+                 burst=GNEWS_BURST, max_workers=MAX_WORKERS, max_retries=MAX_RETRIES,
+                 ticker_timeout=TICKER_TIMEOUT):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.ticker_timeout = ticker_timeout
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def search(self, query, max_articles=10):
+        """Return the article list for one query, or [] once retries or the deadline run out."""
+        params = {
+            "q": query,
+            "token": self.api_key,
+            "lang": "en",
+            "max": max_articles,
+            "sort_by": "publishedAt"
+        }
+        deadline = time.monotonic() + self.ticker_timeout
+        for attempt in range(self.max_retries + 1):
+            if not self.bucket.acquire(deadline):
+                break
+            remaining = deadline - time.monotonic()
+            try:
+                with timed("ingest", "http_fetch"):
+                    response = self.session.get(self.endpoint, params=params,
+                                                timeout=(REQUEST_TIMEOUT[0], min(REQUEST_TIMEOUT[1], max(remaining, 0.1))))
+            except requests.RequestException as e:
+                count("http_requests", status="error")
+                logger.warning("Request error for query %r: %s", query[:40], e)
+                response = None
+            if response is not None:
+                count("http_requests", status=str(response.status_code))
+                if response.status_code == 200:
+                    return response.json().get("articles", [])
+                if response.status_code not in RETRY_STATUSES:
+                    logger.warning("Failed to fetch news for %r: %s %s", query[:40], response.status_code, response.text[:200])
+                    return []
+            if attempt == self.max_retries:
+                break
+            delay = BACKOFF_BASE * (2 ** attempt) * (1 + random.random())
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            if time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+        count("news_queries_failed")
+        logger.warning("Giving up on query %r after %d attempt(s)", query[:40], attempt + 1)
+        return []
+
+    def search_many(self, queries, max_articles=10):
+        """Run {key: query} concurrently; returns {key: articles} in input order."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {key: pool.submit(self.search, q, max_articles) for key, q in queries.items()}
+            return {key: f.result() for key, f in futures.items()}
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,141 @@
+import json
+import math
+import os
+import threading
+import time
+
+from src.news_client import GNEWS_REQUESTS_PER_SECOND, MAX_WORKERS
+
+THROUGHPUT_PATH = os.path.join("data", "throughput.json")
+# 0 = no daily request quota on the GNews plan
+GNEWS_DAILY_QUOTA = int(os.environ.get("GNEWS_DAILY_QUOTA", "0"))
+# Portfolios must finish within this many seconds by the measured throughput...
+INTERACTIVE_BUDGET_SECONDS = float(os.environ.get("INTERACTIVE_BUDGET_SECONDS", "600"))
+# ...unless an explicit ticker limit is configured
+MAX_PORTFOLIO_TICKERS = int(os.environ.get("MAX_PORTFOLIO_TICKERS", "0"))
+# Smoothing for new throughput measurements
+THROUGHPUT_ALPHA = 0.3
+
+# Starting rates until real runs have been measured
+DEFAULT_THROUGHPUT = {
+    "news_tickers_per_second": min(GNEWS_REQUESTS_PER_SECOND, 2.0),
+    "articles_per_ticker": 10.0,
+    "headlines_per_second": 20.0,
+    "feature_tickers_per_second": 5.0,
+    "regression_seconds": 5.0,
+}
+
+_throughput_lock = threading.Lock()
+
+
+def load_throughput(path=THROUGHPUT_PATH):
+    rates = dict(DEFAULT_THROUGHPUT)
+    if os.path.exists(path):
+        with open(path) as f:
+            rates.update(json.load(f))
+    return rates
+
+
+def record_throughput(measured, path=THROUGHPUT_PATH):
+    """Blend {rate name: measured value} into the stored rates (EWMA) and save them."""
+    with _throughput_lock:
+        rates = load_throughput(path)
+        for name, value in measured.items():
+            if value is None or not math.isfinite(value) or value <= 0:
+                continue
+            rates[name] = THROUGHPUT_ALPHA * value + (1 - THROUGHPUT_ALPHA) * rates.get(name, value)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(rates, f, indent=2)
+        os.replace(tmp, path)
+    return rates
+
+
+class PortfolioPlan:
+    """
+    How an N-ticker portfolio will be executed: one news query per ticker on
+    news_workers threads, paced by the client's shared rate limit, and the
+    expected runtime per stage from measured rates. Price downloads are
+    grouped by the price store itself, from the spans it is actually missing.
+    """
+
+    def __init__(self, tickers, rates=None, news_workers=MAX_WORKERS,
+                 requests_per_second=GNEWS_REQUESTS_PER_SECOND, daily_quota=GNEWS_DAILY_QUOTA):
+        self.tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+        self.rates = rates or load_throughput()
+        # Workers pull tickers from a shared queue, so the split follows the actual per-ticker cost
+        self.news_workers = max(1, min(news_workers, len(self.tickers)))
+        self.requests_per_second = requests_per_second
+        self.daily_quota = daily_quota
+
+    @property
+    def within_quota(self):
+        return not self.daily_quota or len(self.tickers) <= self.daily_quota
+
+    def estimate(self):
+        """Expected seconds per stage and in total."""
+        n = len(self.tickers)
+        r = self.rates
+        news_rate = min(r["news_tickers_per_second"], self.requests_per_second)
+        stages = {
+            "fetch": n / news_rate if n else 0.0,
+            "score": n * r["articles_per_ticker"] / r["headlines_per_second"],
+            "features": n / r["feature_tickers_per_second"],
+            "regression": r["regression_seconds"] if n else 0.0,
+        }
+        stages["total"] = sum(stages.values())
+        return stages
+
+    def describe(self):
+        est = self.estimate()
+        return (f"{len(self.tickers)} tickers: news queries at up to "
+                f"{self.requests_per_second:g} req/s on {self.news_workers} workers; "
+                f"estimated {est['total']:.0f}s (fetch {est['fetch']:.0f}s, score {est['score']:.0f}s, "
+                f"features {est['features']:.0f}s, regression {est['regression']:.0f}s)")
+
+
+def max_portfolio_size(budget_seconds=INTERACTIVE_BUDGET_SECONDS, rates=None):
+    """
+    Largest portfolio allowed: MAX_PORTFOLIO_TICKERS when set, otherwise the
+    most tickers whose estimated runtime fits in budget_seconds, capped by
+    the daily news quota.
+    """
+    if MAX_PORTFOLIO_TICKERS:
+        return MAX_PORTFOLIO_TICKERS
+    rates = rates or load_throughput()
+    per_ticker = PortfolioPlan(["X"], rates).estimate()
+    marginal = per_ticker["total"] - per_ticker["regression"]
+    limit = int((budget_seconds - rates["regression_seconds"]) // marginal) if marginal > 0 else 0
+    if GNEWS_DAILY_QUOTA:
+        limit = min(limit, GNEWS_DAILY_QUOTA)
+    return max(limit, 1)
+
+
+class StageTimer:
+    """Collects stage durations for a run and turns them into throughput measurements."""
+
+    def __init__(self):
+        self.seconds = {}
+        self._start = None
+        self._stage = None
+
+    def start(self, stage):
+        self.stop()
+        self._stage, self._start = stage, time.perf_counter()
+
+    def stop(self):
+        if self._stage is not None:
+            self.seconds[self._stage] = time.perf_counter() - self._start
+            self._stage = None
+
+    def measurements(self, tickers, headlines):
+        s = self.seconds
+        return {
+            "news_tickers_per_second": tickers / s["fetch"] if s.get("fetch") else None,
+            "articles_per_ticker": headlines / tickers if tickers else None,
+            "headlines_per_second": headlines / s["score"] if s.get("score") and headlines else None,
+            "feature_tickers_per_second": tickers / s["features"] if s.get("features") else None,
+            "regression_seconds": s.get("regression"),
+        }
@@ -0,0 +1,261 @@
+import json
+import os
+import re
+import threading
+
+import pandas as pd
+
+from src.metrics import timed, count
+
+DEFAULT_STORE_DIR = "data/prices"
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Symbols per multi-ticker yf.download request, and bulk requests in flight
+BULK_CHUNK_SIZE = 50
+BULK_WORKERS = 4
+# Daily bars are final only after the US close; give Yahoo an hour past 16:00 ET to settle them
+MARKET_TZ = "America/New_York"
+SESSION_SETTLED_HOUR = 17
+
+
+class YFinanceProvider:
+    """Downloads daily bars from Yahoo Finance. end is exclusive, as in yf.download."""
+
+    def fetch(self, symbol, start, end):
+        import yfinance as yf
+        df = yf.download(symbol, start=start, end=end, progress=False)
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        return df
+
+    def fetch_many(self, symbols, start, end):
+        """One bulk request for several symbols; returns {symbol: DataFrame}."""
+        import yfinance as yf
+        df = yf.download(list(symbols), start=start, end=end, progress=False, group_by="ticker", threads=True)
+        if df is None or df.empty:
+            return {}
+        if not isinstance(df.columns, pd.MultiIndex):
+            return {symbols[0]: df} if len(symbols) == 1 else {}
+        return {s: df[s].dropna(how="all") for s in symbols if s in df.columns.get_level_values(0)}
+
+
+def completed_sessions_end(now=None):
+    """
+    Exclusive end of the sessions whose daily bars are final: tomorrow once
+    today's session has settled, otherwise today. A bar for a session still
+    trading is a partial close (or missing), so it must not be covered.
+    """
+    now = pd.Timestamp.now(tz=MARKET_TZ) if now is None else pd.Timestamp(now).tz_convert(MARKET_TZ)
+    today = now.tz_localize(None).normalize()
+    return today + pd.Timedelta(days=1) if now.hour >= SESSION_SETTLED_HOUR else today
+
+
+def _to_day(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return ts.normalize()
+
+
+class PriceStore:
+    """
+    Local per-symbol Parquet store of daily prices. Each symbol keeps one
+    contiguous covered date range; requests outside it fetch only the missing
+    edges from the provider, and window slices are served from memory.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, provider=None):
+        self.root = root
+        self.provider = provider or YFinanceProvider()
+        self._frames = {}
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+        self._coverage_path = os.path.join(root, "_coverage.json")
+        self._coverage = {}
+        if os.path.exists(self._coverage_path):
+            with open(self._coverage_path) as f:
+                self._coverage = {s: (pd.Timestamp(a), pd.Timestamp(b)) for s, (a, b) in json.load(f).items()}
+
+    def _path(self, symbol):
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9._-]", "_", symbol) + ".parquet")
+
+    def _save_coverage(self):
+        # Write then rename, so a crash never leaves a truncated coverage file
+        tmp = self._coverage_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({s: [a.strftime("%Y-%m-%d"), b.strftime("%Y-%m-%d")] for s, (a, b) in self._coverage.items()}, f)
+        os.replace(tmp, self._coverage_path)
+
+    def _load(self, symbol):
+        if symbol not in self._frames:
+            path = self._path(symbol)
+            if symbol in self._coverage and os.path.exists(path):
+                self._frames[symbol] = pd.read_parquet(path)
+            else:
+                self._coverage.pop(symbol, None)
+                self._frames[symbol] = pd.DataFrame(columns=PRICE_COLUMNS, index=pd.DatetimeIndex([]))
+        return self._frames[symbol]
+
+    def _fetch(self, symbol, start, end):
+        count("price_requests", mode="single")
+        with timed("features", "price_download"):
+            df = self.provider.fetch(symbol, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+        return self._clean(df)
+
+    @staticmethod
+    def _clean(df):
+        if df is None or df.empty:
+            return None
+        df = df[[c for c in PRICE_COLUMNS if c in df.columns]].astype("float64")
+        df.index = pd.DatetimeIndex([_to_day(d) for d in df.index])
+        return df
+
+    @staticmethod
+    def _clamp_end(end):
+        # Never mark unfinished sessions as covered, so they are fetched once they have closed
+        return min(_to_day(end), completed_sessions_end())
+
+    def _missing_span(self, symbol, start, end):
+        """Smallest range that, once fetched, leaves [start, end) covered and coverage contiguous."""
+        # Caller holds the lock and has loaded the symbol
+        covered = self._coverage.get(symbol)
+        if covered is None:
+            return start, end
+        gaps = []
+        if start < covered[0]:
+            gaps.append((start, covered[0]))
+        if end > covered[1]:
+            gaps.append((covered[1], end))
+        if not gaps:
+            return None
+        return gaps[0][0], gaps[-1][1]
+
+    def _merge(self, symbol, fetched):
+        """
+        Add fetched [(bars, start, end)] to the symbol. Coverage grows only
+        over spans that returned bars; an empty or failed fetch stays
+        uncovered and is retried on the next request. True if anything changed.
+        """
+        # Caller holds the lock; every span borders or overlaps the covered range
+        frame = self._load(symbol)
+        covered = self._coverage.get(symbol)
+        frames = []
+        for bars, start, end in fetched:
+            if bars is None:
+                continue
+            frames.append(bars)
+            covered = (start, end) if covered is None else (min(start, covered[0]), max(end, covered[1]))
+        if not frames:
+            return False
+        frame = pd.concat(frames if frame.empty else [frame] + frames)
+        frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+        path = self._path(symbol)
+        frame.to_parquet(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self._frames[symbol] = frame
+        self._coverage[symbol] = covered
+        return True
+
+    def ensure(self, symbol, start, end):
+        """Make sure [start, end) is covered locally, fetching only the missing edges."""
+        start, end = _to_day(start), self._clamp_end(end)
+        if start >= end:
+            return
+        with self._lock:
+            self._load(symbol)
+            covered = self._coverage.get(symbol)
+            if covered is None:
+                gaps = [(start, end)]
+            else:
+                gaps = []
+                if start < covered[0]:
+                    gaps.append((start, covered[0]))
+                if end > covered[1]:
+                    gaps.append((covered[1], end))
+            if not gaps:
+                return
+            if self._merge(symbol, [(self._fetch(symbol, a, b), a, b) for a, b in gaps]):
+                self._save_coverage()
+
+    def ensure_many(self, ranges, chunk_size=BULK_CHUNK_SIZE, workers=BULK_WORKERS):
+        """
+        ensure() for many {symbol: (start, end)} at once. Missing spans are
+        grouped into multi-symbol bulk requests of up to chunk_size symbols
+        with similar start dates, fetched on up to workers threads. Providers
+        without fetch_many fall back to one request per symbol.
+        """
+        with self._lock:
+            spans = {}
+            for symbol, (start, end) in ranges.items():
+                start, end = _to_day(start), self._clamp_end(end)
+                if start < end:
+                    self._load(symbol)
+                    span = self._missing_span(symbol, start, end)
+                    if span is not None:
+                        spans[symbol] = (start, end, span)
+        if not spans:
+            return
+        if not hasattr(self.provider, "fetch_many"):
+            for symbol, (start, end, _) in spans.items():
+                self.ensure(symbol, start, end)
+            return
+        ordered = sorted(spans, key=lambda s: spans[s][2])
+        chunks = [ordered[i:i + chunk_size] for i in range(0, len(ordered), chunk_size)]
+
+        def fetch_chunk(symbols):
+            lo = min(spans[s][2][0] for s in symbols)
+            hi = max(spans[s][2][1] for s in symbols)
+            count("price_requests", mode="bulk")
+            with timed("features", "price_download_bulk"):
+                frames = self.provider.fetch_many(symbols, lo.strftime("%Y-%m-%d"), hi.strftime("%Y-%m-%d"))
+            with self._lock:
+                changed = False
+                for s in symbols:
+                    # The bulk range contains this symbol's span, so coverage stays contiguous
+                    start, end, _ = spans[s]
+                    changed |= self._merge(s, [(self._clean(frames.get(s)), min(start, lo), max(end, hi))])
+                if changed:
+                    self._save_coverage()
+
+        if workers > 1 and len(chunks) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(fetch_chunk, chunks))
+        else:
+            for chunk in chunks:
+                fetch_chunk(chunk)
+
+    def warm(self, ranges, chunk_size=BULK_CHUNK_SIZE, workers=BULK_WORKERS):
+        """Fetch the union date range of every (symbol, start, end) request once per symbol."""
+        union = {}
+        for symbol, start, end in ranges:
+            start, end = _to_day(start), _to_day(end)
+            if symbol in union:
+                union[symbol] = (min(union[symbol][0], start), max(union[symbol][1], end))
+            else:
+                union[symbol] = (start, end)
+        self.ensure_many(union, chunk_size, workers)
+
+    def window(self, symbol, start, end):
+        """Prices for start <= date < end."""
+        self.ensure(symbol, start, end)
+        with self._lock:
+            frame = self._load(symbol)
+        start, end = _to_day(start), _to_day(end)
+        return frame.loc[(frame.index >= start) & (frame.index < end)]
+
+    def get(self, symbol):
+        with self._lock:
+            return self._load(symbol)
+
+
+_default_store = None
+_store_lock = threading.Lock()
+
+
+def get_default_store():
+    global _default_store
+    if _default_store is None:
+        with _store_lock:
+            if _default_store is None:
+                _default_store = PriceStore()
+    return _default_store
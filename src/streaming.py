@@ -0,0 +1,191 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+
+from src.abnormal_return_calc import compute_event_features
+from src.dedup import NearDuplicateIndex, article_text
+from src.metrics import get_logger
+
+logger = get_logger("streaming")
+
+QUEUE_SIZE = 256
+SCORE_BATCH_SIZE = 32
+FEATURE_BATCH_SIZE = 64
+FLUSH_SECONDS = 0.5
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, stage, exc):
+        self.stage = stage
+        self.exc = exc
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _put(q, item, stop):
+    # Blocking put (this is the backpressure) that still notices cancellation
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+    raise _Stopped()
+
+
+def _items(q, stop):
+    """Yield items from q until the upstream stage finishes; re-raise upstream errors."""
+    while not stop.is_set():
+        try:
+            item = q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _StageError):
+            raise item.exc
+        yield item
+    raise _Stopped()
+
+
+def _batches(q, stop, size, flush_seconds):
+    """Group items from q into lists of up to size, flushing partial batches after flush_seconds."""
+    batch, first_at = [], None
+    while True:
+        if stop.is_set():
+            raise _Stopped()
+        timeout = 0.1 if first_at is None else max(0.0, min(0.1, first_at + flush_seconds - time.monotonic()))
+        try:
+            item = q.get(timeout=timeout)
+        except queue.Empty:
+            item = None
+        if item is _DONE:
+            if batch:
+                yield batch
+            return
+        if isinstance(item, _StageError):
+            raise item.exc
+        if item is not None:
+            batch.append(item)
+            first_at = first_at or time.monotonic()
+        if batch and (len(batch) >= size or time.monotonic() - first_at >= flush_seconds):
+            yield batch
+            batch, first_at = [], None
+
+
+def _stage(name, out, stop, body):
+    def run():
+        try:
+            body()
+            _put(out, _DONE, stop)
+        except _Stopped:
+            pass
+        except Exception as e:
+            try:
+                _put(out, _StageError(name, e), stop)
+            except _Stopped:
+                pass
+    thread = threading.Thread(target=run, name=f"stream-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def stream_features(tickers, client, query_fn, filter_fn, score_fn, store, max_articles=10,
+                    queue_size=QUEUE_SIZE, score_batch_size=SCORE_BATCH_SIZE,
+                    feature_batch_size=FEATURE_BATCH_SIZE, flush_seconds=FLUSH_SECONDS):
+    """
+    Run fetch -> filter -> score -> features as concurrent stages joined by
+    bounded queues and yield market-feature DataFrames as they are produced.
+    A slow stage blocks the ones upstream of it, so memory use depends on
+    the queue sizes and not on the portfolio size.
+
+    query_fn(ticker) builds the news query, filter_fn(ticker, articles)
+    returns news rows, score_fn(texts) returns (label, score) pairs.
+    """
+    stop = threading.Event()
+    raw_q, news_q, unique_q, scored_q, out_q = (queue.Queue(maxsize=queue_size) for _ in range(5))
+
+    def fetch():
+        # Keep only a few tickers in flight so fetched pages don't pile up
+        pending = {}
+        ticker_iter = iter(tickers)
+        with ThreadPoolExecutor(max_workers=client.max_workers) as pool:
+            while True:
+                while len(pending) < 2 * client.max_workers:
+                    ticker = next(ticker_iter, None)
+                    if ticker is None:
+                        break
+                    pending[pool.submit(client.search, query_fn(ticker), max_articles)] = ticker
+                if not pending:
+                    return
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    ticker = pending.pop(future)
+                    _put(raw_q, (ticker, future.result()), stop)
+
+    def filter_articles():
+        for ticker, articles in _items(raw_q, stop):
+            for row in filter_fn(ticker, articles):
+                _put(news_q, row, stop)
+
+    def dedup():
+        # Syndicated copies collapse onto the first one seen: a copy for a ticker
+        # the canonical already covers is dropped, a copy for a new ticker is
+        # forwarded with the canonical text so scoring hits the cache
+        index = NearDuplicateIndex()
+        canonical = OrderedDict()
+        total = dropped = 0
+        for row in _items(news_q, stop):
+            total += 1
+            sig = index.signature(article_text(row.get("title"), row.get("description")))
+            key = index.query(sig)
+            if key not in canonical:
+                index.add(total, sig)
+                canonical[total] = (row, {row["ticker"]})
+                while len(canonical) > index.max_items:
+                    canonical.popitem(last=False)
+                _put(unique_q, row, stop)
+                continue
+            first, covered = canonical[key]
+            if row["ticker"] in covered:
+                dropped += 1
+                continue
+            covered.add(row["ticker"])
+            _put(unique_q, dict(first, ticker=row["ticker"], url=row.get("url")), stop)
+        if total:
+            logger.info("Streaming dedup: dropped %d of %d articles (%.1f%%)", dropped, total, 100 * dropped / total)
+
+    def score():
+        for batch in _batches(unique_q, stop, score_batch_size, flush_seconds):
+            scored = score_fn([row["title"] for row in batch])
+            for row, (label, value) in zip(batch, scored):
+                _put(scored_q, dict(row, sentiment_label=label, sentiment_score=value), stop)
+
+    def features():
+        for batch in _batches(scored_q, stop, feature_batch_size, flush_seconds):
+            features_df = compute_event_features(pd.DataFrame(batch), store)
+            if len(features_df):
+                _put(out_q, features_df, stop)
+
+    threads = [
+        _stage("fetch", raw_q, stop, fetch),
+        _stage("filter", news_q, stop, filter_articles),
+        _stage("dedup", unique_q, stop, dedup),
+        _stage("score", scored_q, stop, score),
+        _stage("features", out_q, stop, features),
+    ]
+    try:
+        for features_df in _items(out_q, stop):
+            yield features_df
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5)
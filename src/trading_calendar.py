@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+
+class TradingCalendar:
+    """
+    Integer index over a sorted set of trading days. Event dates map to
+    positions once, after which windows are plain positional offsets.
+    """
+
+    def __init__(self, dates):
+        self.dates = pd.DatetimeIndex(dates).normalize().unique().sort_values()
+        self._values = self.dates.values
+
+    def __len__(self):
+        return len(self.dates)
+
+    def positions(self, event_dates):
+        """
+        Position of each event's first trading day on or after its date, so
+        news from a weekend or holiday is priced at the next session.
+        Dates past the end of the calendar map to len(self).
+        """
+        values = pd.DatetimeIndex(event_dates).normalize().values
+        return np.searchsorted(self._values, values, side="left")
+
+    def window(self, positions, start_offset, end_offset):
+        """
+        Half-open [lo, hi) slice bounds for offsets start_offset..end_offset
+        (inclusive) around each position, and whether the full window fits.
+        """
+        positions = np.asarray(positions)
+        lo = positions + start_offset
+        hi = positions + end_offset + 1
+        return lo, hi, (lo >= 0) & (hi <= len(self))
+
+    def offsets(self, positions, offsets):
+        """events x offsets matrix of positions, plus an in-range mask."""
+        grid = np.asarray(positions)[:, None] + np.asarray(offsets)[None, :]
+        return grid, (grid >= 0) & (grid < len(self))
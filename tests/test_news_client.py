@@ -0,0 +1,137 @@
+"""
+GNewsClient against a local http.server stub: retries on 429/5xx, the
+per-query deadline and the shared rate limit. Runs offline.
+
+    python -m pytest tests/test_news_client.py
+"""
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from src import news_client
+from src.news_client import GNewsClient
+
+ARTICLES = [{"title": "ACME cuts emissions", "description": "", "publishedAt": "2024-01-02T14:00:00Z",
+             "url": "https://news.example.com/acme/1"}]
+
+
+class StubGNews:
+    """
+    GNews search endpoint on localhost. Each query answers with its scripted
+    (status, headers) responses in turn, repeating the last one, and a 200
+    returns ARTICLES. Request times are kept for rate checks.
+    """
+
+    def __init__(self, script=None, default=(200, {})):
+        self.script = {q: list(responses) for q, responses in (script or {}).items()}
+        self.default = default
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+                status, headers = stub._next(query)
+                body = json.dumps({"articles": ARTICLES} if status == 200 else {"errors": ["stub"]}).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/api/v4/search"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def _next(self, query):
+        with self._lock:
+            self.requests.append((query, time.monotonic()))
+            responses = self.script.get(query)
+            if not responses:
+                return self.default
+            return responses.pop(0) if len(responses) > 1 else responses[0]
+
+    def count(self, query):
+        return sum(1 for q, _ in self.requests if q == query)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class GNewsClientTest(unittest.TestCase):
+
+    def setUp(self):
+        # Keep exponential backoff in the tens of milliseconds
+        patcher = mock.patch.object(news_client, "BACKOFF_BASE", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def client(self, stub, **kwargs):
+        kwargs.setdefault("requests_per_second", 100)
+        kwargs.setdefault("burst", 10)
+        client = GNewsClient("test-key", endpoint=stub.endpoint, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_retries_after_429(self):
+        with StubGNews({"ACME": [(429, {"Retry-After": "0"}), (200, {})]}) as stub:
+            articles = self.client(stub).search("ACME")
+        self.assertEqual(articles, ARTICLES)
+        self.assertEqual(stub.count("ACME"), 2)
+
+    def test_gives_up_after_max_retries_on_5xx(self):
+        with StubGNews({"ACME": [(503, {})]}) as stub:
+            articles = self.client(stub, max_retries=2).search("ACME")
+        self.assertEqual(articles, [])
+        self.assertEqual(stub.count("ACME"), 3)
+
+    def test_does_not_retry_other_errors(self):
+        with StubGNews({"ACME": [(403, {})]}) as stub:
+            articles = self.client(stub).search("ACME")
+        self.assertEqual(articles, [])
+        self.assertEqual(stub.count("ACME"), 1)
+
+    def test_deadline_stops_retries(self):
+        # The server asks for a longer wait than the query has left
+        with StubGNews({"ACME": [(503, {"Retry-After": "5"})]}) as stub:
+            start = time.monotonic()
+            articles = self.client(stub, max_retries=10, ticker_timeout=0.5).search("ACME")
+            elapsed = time.monotonic() - start
+        self.assertEqual(articles, [])
+        self.assertEqual(stub.count("ACME"), 1)
+        self.assertLess(elapsed, 0.5)
+
+    def test_rate_limit_holds_across_workers(self):
+        rate, burst, n = 20.0, 2, 30
+        with StubGNews() as stub:
+            client = self.client(stub, requests_per_second=rate, burst=burst, max_workers=8)
+            results = client.search_many({i: f"Q{i}" for i in range(n)})
+        self.assertEqual(len(results), n)
+        self.assertTrue(all(articles == ARTICLES for articles in results.values()))
+        times = sorted(t for _, t in stub.requests)
+        self.assertEqual(len(times), n)
+        # After the initial burst, requests arrive no faster than the bucket refills
+        elapsed = times[-1] - times[0]
+        self.assertLessEqual((n - burst) / elapsed, rate * 1.05)
+
+
+if __name__ == "__main__":
+    unittest.main()